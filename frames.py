@@ -0,0 +1,225 @@
+import queue
+import threading
+import time
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+
+class FrameSink:
+    """
+    Receives state arrays of a simulation, one per step. Sinks can be used as context managers.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, frame):
+        """
+        Adds state array as the next frame.
+        :param frame: 2-D array of states
+        :type frame: numpy array
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Finishes writing of the frames.
+        """
+
+
+class GifWriter(FrameSink):
+    """
+    Writes integer state arrays as palette-mode frames of an animated gif. Every frame is encoded and written
+    to the file when it arrives, so memory does not grow with the number of frames.
+    :param path: path of the gif file, created on the first frame
+    :type path: str
+    :param palette: RGB colours, state k is drawn with palette[k]
+    :type palette: list of tuples
+    :param duration: display time of every frame in ms
+    :type duration: int
+    :param scale: every cell is drawn as scale x scale block of pixels, by default 4 for boards up to 100 cells
+    wide and less for larger ones, down to 1 from 400 cells
+    :type scale: int or None
+    """
+
+    def __init__(self, path, palette, duration=500, scale=None):
+        self.path = path
+        self.duration = duration
+        self.scale = scale
+        self._palette = [value for colour in palette for value in colour]
+        self._file = None
+
+    def append(self, frame):
+        frame = np.asarray(frame).astype(np.uint8)
+        scale = self.scale or min(4, max(1, 400 // max(frame.shape)))
+        if scale > 1:
+            frame = np.repeat(np.repeat(frame, scale, axis=0), scale, axis=1)
+        height, width = frame.shape
+        image = Image.frombuffer('P', (width, height), np.ascontiguousarray(frame).tobytes(), 'raw', 'P', 0, 1)
+        image.putpalette(self._palette)
+        if self._file is None:
+            header, _ = GifImagePlugin.getheader(image, info={'loop': 0, 'duration': self.duration,
+                                                              'optimize': False})
+            self._file = open(self.path, 'wb')
+            self._file.write(b''.join(header))
+        self._file.write(b''.join(GifImagePlugin.getdata(image, duration=self.duration)))
+
+    def close(self):
+        if self._file is None or self._file.closed:
+            return
+        self._file.write(b';')
+        self._file.close()
+
+
+class StackSink(FrameSink):
+    """
+    Collects frames in memory and saves them as one (n_frames, rows, columns) array,
+    to a compressed .npz archive (under key "frames") or to a .npy file.
+    :param path: path of the .npz or .npy file
+    :type path: str
+    :param dtype: type to which the frames are cast
+    """
+
+    def __init__(self, path, dtype=np.uint8):
+        self.path = path
+        self.dtype = dtype
+        self._frames = []
+
+    def append(self, frame):
+        self._frames.append(np.array(frame, dtype=self.dtype))
+
+    def close(self):
+        if not self._frames:
+            return
+        frames = np.stack(self._frames)
+        if self.path.endswith('.npy'):
+            np.save(self.path, frames)
+        else:
+            np.savez_compressed(self.path, frames=frames)
+        self._frames = []
+
+
+class MemmapSink(FrameSink):
+    """
+    Appends frames straight to a .npy file on disk, so runs larger than memory can be recorded.
+    The header is rewritten with the final number of frames on close; the file can then be
+    opened lazily with np.load(path, mmap_mode='r').
+    :param path: path of the .npy file
+    :type path: str
+    :param dtype: type to which the frames are cast
+    """
+    _header_size = 128
+
+    def __init__(self, path, dtype=np.uint8):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.n_frames = 0
+        self._shape = None
+        self._file = open(path, 'wb')
+        self._file.write(b'\0' * self._header_size)
+
+    def append(self, frame):
+        frame = np.ascontiguousarray(frame, dtype=self.dtype)
+        if self._shape is None:
+            self._shape = frame.shape
+        elif frame.shape != self._shape:
+            raise ValueError("frame of shape {} does not match {}".format(frame.shape, self._shape))
+        self._file.write(frame.tobytes())
+        self.n_frames += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(self._get_header())
+        self._file.close()
+
+    def _get_header(self):
+        shape = (self.n_frames,) + (self._shape or (0, 0))
+        header = "{{'descr': {!r}, 'fortran_order': False, 'shape': {}, }}".format(
+            np.lib.format.dtype_to_descr(self.dtype), shape)
+        prefix = b'\x93NUMPY\x01\x00'
+        length = self._header_size - len(prefix) - 2
+        header = header.ljust(length - 1) + '\n'
+        return prefix + len(header).to_bytes(2, 'little') + header.encode('latin1')
+
+
+class AsyncSink(FrameSink):
+    """
+    Passes frames to another sink on a background thread, so the simulation does not wait for encoding.
+    Frames are copied into a bounded queue; when the queue is full append blocks until the worker catches up.
+    The worker also closes the sink, so close only waits for it to finish.
+    :param sink: sink doing the actual writing
+    :type sink: FrameSink
+    :param maxsize: maximum number of frames waiting in the queue
+    :type maxsize: int
+    """
+
+    def __init__(self, sink, maxsize=64):
+        self.sink = sink
+        self.simulation_time, self.render_time, self.blocked_time = 0.0, 0.0, 0.0
+        self.n_frames = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._error = None
+        self._last_append = None
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def append(self, frame):
+        now = time.perf_counter()
+        if self._last_append is not None:
+            self.simulation_time += now - self._last_append
+        self._raise_error()
+        self._queue.put(np.array(frame))
+        self._last_append = time.perf_counter()
+        self.blocked_time += self._last_append - now
+        self.n_frames += 1
+
+    def flush(self):
+        """
+        Waits until all queued frames have been passed to the sink.
+        """
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        if not self._worker.is_alive():
+            return
+        self._queue.put(None)
+        self._worker.join()
+        self._raise_error()
+
+    def stats(self):
+        """
+        Gets timing counters: time spent by the simulation between frames, time spent by the worker
+        writing frames and closing the sink and time the simulation was blocked on a full queue (all in seconds).
+        :return: dictionary with counters
+        :rtype: dict
+        """
+        return {'frames': self.n_frames, 'simulation_time': self.simulation_time,
+                'render_time': self.render_time, 'blocked_time': self.blocked_time}
+
+    def _work(self):
+        while True:
+            frame = self._queue.get()
+            start = time.perf_counter()
+            try:
+                if frame is None:
+                    self.sink.close()
+                elif self._error is None:
+                    self.sink.append(frame)
+            except Exception as error:
+                self._error = self._error or error
+            finally:
+                self.render_time += time.perf_counter() - start
+                self._queue.task_done()
+            if frame is None:
+                return
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
@@ -0,0 +1,231 @@
+from collections import OrderedDict
+import numpy as np
+from history import StateHistory
+
+
+class Node:
+    """
+    Quadtree node covering 2**level x 2**level cells. Nodes are canonical: equal
+    contents are always represented by the same object, so identity can be used for hashing.
+    """
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.level = level
+        self.population = population
+
+
+class HashLife:
+    """
+    Hashlife engine: the board is a canonicalized quadtree and results of advancing nodes
+    are memoized, so repeated structure in space and time is computed only once and
+    the board can jump 2**j generations per step.
+
+    The universe is an unbounded plane, so unlike the other lattices cells leaving the
+    initialized window keep evolving outside of it (get_state shows the initialized window only).
+
+    :param cache_size: maximum number of memoized node results, least recently used ones are evicted
+    """
+
+    def __init__(self, cache_size=2 ** 20):
+        self.cache_size = cache_size
+        self.hits, self.misses = 0, 0
+        self.generation = 0
+        self.root = None
+        self.top, self.left = 0, 0
+        self._shape = None
+        self._nodes = {}
+        self._results = OrderedDict()
+        self._off = Node(None, None, None, None, 0, 0)
+        self._on = Node(None, None, None, None, 0, 1)
+        self._empty = [self._off]
+
+    def initialize(self, n_rows, n_columns):
+        self._shape = (n_rows, n_columns)
+        self.set_state(np.zeros(self._shape, dtype=np.uint8))
+
+    def get_state(self):
+        return self.get_window(0, 0, *self._shape)
+
+    def is_empty(self):
+        return not self.get_state().any()
+
+    def fingerprint(self):
+        return StateHistory.fingerprint(self.get_state())
+
+    def set_state(self, states):
+        states = np.asarray(states, dtype=bool)
+        level = max(3, int(np.ceil(np.log2(max(states.shape)))))
+        padded = np.zeros([2 ** level, 2 ** level], dtype=bool)
+        padded[:states.shape[0], :states.shape[1]] = states
+        self.root = self._from_array(padded, level)
+        self.top, self.left = 0, 0
+
+    def change_state(self):
+        self.advance(1)
+
+    def advance(self, generations):
+        """
+        Advances the board by the given number of generations, jumping by the largest power of two at a time.
+        :param generations: number of generations
+        """
+        while generations > 0:
+            j = generations.bit_length() - 1
+            while self.root.level < j + 1:
+                self._pad()
+            self._pad()
+            self._pad()
+            size = 2 ** self.root.level
+            self.root = self._successor(self.root, j)
+            self.top += size // 4
+            self.left += size // 4
+            self._crop()
+            self.generation += 2 ** j
+            generations -= 2 ** j
+            if len(self._nodes) > 4 * self.cache_size:
+                self._collect_garbage()
+
+    def get_window(self, top, left, n_rows, n_columns):
+        """
+        Gets dense array of statuses for the given window of the plane.
+        :param top: first row of the window
+        :param left: first column of the window
+        :param n_rows: number of rows of the window
+        :param n_columns: number of columns of the window
+        :return: uint8 array of statuses
+        """
+        window = np.zeros([n_rows, n_columns], dtype=np.uint8)
+        self._fill(self.root, self.top - top, self.left - left, window)
+        return window
+
+    def _fill(self, node, top, left, window):
+        size = 2 ** node.level
+        if not node.population or top >= window.shape[0] or left >= window.shape[1] \
+                or top + size <= 0 or left + size <= 0:
+            return
+        if node.level == 0:
+            window[top, left] = 1
+            return
+        half = size // 2
+        self._fill(node.nw, top, left, window)
+        self._fill(node.ne, top, left + half, window)
+        self._fill(node.sw, top + half, left, window)
+        self._fill(node.se, top + half, left + half, window)
+
+    def _from_array(self, states, level):
+        if level == 0:
+            return self._on if states[0, 0] else self._off
+        if not states.any():
+            return self._get_empty(level)
+        half = 2 ** (level - 1)
+        return self._join(self._from_array(states[:half, :half], level - 1),
+                          self._from_array(states[:half, half:], level - 1),
+                          self._from_array(states[half:, :half], level - 1),
+                          self._from_array(states[half:, half:], level - 1))
+
+    def _join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is None:
+            population = nw.population + ne.population + sw.population + se.population
+            node = Node(nw, ne, sw, se, nw.level + 1, population)
+            self._nodes[key] = node
+        return node
+
+    def _get_empty(self, level):
+        while len(self._empty) <= level:
+            e = self._empty[-1]
+            self._empty.append(self._join(e, e, e, e))
+        return self._empty[level]
+
+    def _centre(self, node):
+        e = self._get_empty(node.level - 1)
+        return self._join(self._join(e, e, e, node.nw), self._join(e, e, node.ne, e),
+                          self._join(e, node.sw, e, e), self._join(node.se, e, e, e))
+
+    def _pad(self):
+        shift = 2 ** (self.root.level - 1)
+        self.root = self._centre(self.root)
+        self.top -= shift
+        self.left -= shift
+
+    def _crop(self):
+        root = self.root
+        while root.level > 3:
+            inner = self._join(root.nw.se, root.ne.sw, root.sw.ne, root.se.nw)
+            if inner.population != root.population:
+                break
+            shift = 2 ** (root.level - 2)
+            self.top += shift
+            self.left += shift
+            root = inner
+        self.root = root
+
+    def _successor(self, node, j):
+        """
+        Gets the centre of the node (one level lower) advanced by 2**j generations, j <= level - 2.
+        """
+        j = min(j, node.level - 2)
+        if not node.population:
+            return self._get_empty(node.level - 1)
+        key = (node, j)
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return result
+        self.misses += 1
+        if node.level == 2:
+            result = self._life_4x4(node)
+        else:
+            result = self._successor_of_children(node, j)
+        self._results[key] = result
+        if len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return result
+
+    def _successor_of_children(self, node, j):
+        join, successor = self._join, self._successor
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        c1 = successor(join(nw.nw, nw.ne, nw.sw, nw.se), j)
+        c2 = successor(join(nw.ne, ne.nw, nw.se, ne.sw), j)
+        c3 = successor(join(ne.nw, ne.ne, ne.sw, ne.se), j)
+        c4 = successor(join(nw.sw, nw.se, sw.nw, sw.ne), j)
+        c5 = successor(join(nw.se, ne.sw, sw.ne, se.nw), j)
+        c6 = successor(join(ne.sw, ne.se, se.nw, se.ne), j)
+        c7 = successor(join(sw.nw, sw.ne, sw.sw, sw.se), j)
+        c8 = successor(join(sw.ne, se.nw, sw.se, se.sw), j)
+        c9 = successor(join(se.nw, se.ne, se.sw, se.se), j)
+        if j < node.level - 2:
+            return join(join(c1.se, c2.sw, c4.ne, c5.nw), join(c2.se, c3.sw, c5.ne, c6.nw),
+                        join(c4.se, c5.sw, c7.ne, c8.nw), join(c5.se, c6.sw, c8.ne, c9.nw))
+        return join(successor(join(c1, c2, c4, c5), j), successor(join(c2, c3, c5, c6), j),
+                    successor(join(c4, c5, c7, c8), j), successor(join(c5, c6, c8, c9), j))
+
+    def _life_4x4(self, node):
+        cells = [[0] * 4 for _ in range(4)]
+        for a, child in enumerate((node.nw, node.ne, node.sw, node.se)):
+            for b, leaf in enumerate((child.nw, child.ne, child.sw, child.se)):
+                cells[2 * (a // 2) + b // 2][2 * (a % 2) + b % 2] = leaf.population
+        new = []
+        for x, y in ((1, 1), (1, 2), (2, 1), (2, 2)):
+            alive = sum(cells[x + a][y + b] for a in (-1, 0, 1) for b in (-1, 0, 1)) - cells[x][y]
+            new.append(self._on if alive == 3 or (cells[x][y] and alive == 2) else self._off)
+        return self._join(*new)
+
+    def _collect_garbage(self):
+        """
+        Drops canonical nodes that are not reachable from the root, together with all memoized results.
+        """
+        reachable, stack = {}, [self.root] + self._empty[1:]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in reachable:
+                reachable[key] = node
+                stack.extend(key)
+        self._nodes = reachable
+        self._results.clear()
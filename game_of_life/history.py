@@ -0,0 +1,49 @@
+from collections import deque
+import hashlib
+import numpy as np
+
+
+class StateHistory:
+    """
+    Bounded history of board fingerprints used to detect still lifes and oscillators.
+    :param size: number of most recent generations that are remembered
+    """
+
+    def __init__(self, size=100):
+        self.size = size
+        self._seen = {}
+        self._order = deque()
+
+    def add(self, lattice, iteration):
+        """
+        Adds board to the history.
+        :param lattice: lattice with the board, hashed by its own fingerprint method
+        :param iteration: number of the generation
+        :return: period of the cycle if the board has already been seen, 0 otherwise
+        """
+        fingerprint = lattice.fingerprint()
+        if fingerprint in self._seen:
+            return iteration - self._seen[fingerprint]
+        self._seen[fingerprint] = iteration
+        self._order.append(fingerprint)
+        if len(self._order) > self.size:
+            del self._seen[self._order.popleft()]
+        return 0
+
+    @staticmethod
+    def fingerprint(statuses):
+        """
+        Gets 128-bit hash of the bit-packed board.
+        """
+        return get_fingerprint(np.packbits(statuses), statuses.shape)
+
+
+def get_fingerprint(data, shape):
+    """
+    Gets 128-bit hash of the raw bytes of a board representation together with the shape of the board.
+    :param data: array holding the board
+    :param shape: number of rows and columns of the board
+    """
+    digest = hashlib.blake2b(np.asarray(shape).tobytes(), digest_size=16)
+    digest.update(np.ascontiguousarray(data).tobytes())
+    return digest.digest()
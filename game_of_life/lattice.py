@@ -2,6 +2,7 @@
 
 import numpy as np
 from cell import cell
+from history import StateHistory, get_fingerprint
 
 class Lattice:
 
@@ -11,16 +12,232 @@ class Lattice:
     def initialize(self, n_rows, n_columns):
         self.grid = np.array([cell() for i in range(n_rows*n_columns)]).reshape([n_rows, n_columns])
 
+    def get_state(self):
+        return np.vectorize(lambda elem: elem.is_alive(), otypes=[np.uint8])(self.grid)
+
+    def is_empty(self):
+        return not self.get_state().any()
+
+    def fingerprint(self):
+        return StateHistory.fingerprint(self.get_state())
+
+    def set_state(self, states):
+        for index, elem in np.ndenumerate(self.grid):
+            if states[index]:
+                elem.set_alive()
+            else:
+                elem.set_dead()
+
     def change_state(self):
         grid = self.grid
         size = grid.shape
+        statuses = self.get_state()
         for index, elem in np.ndenumerate(grid):
-
-
             neigh = elem.get_neighbours(index[0], index[1], size)
-            neighs = [grid.item(cords) for cords in neigh]
-            neighs_statuses = [n._status for n in neighs]
+            neighs_statuses = [statuses[cords] for cords in neigh]
             if elem.is_alive():
                 elem.handle_when_alive(neighs_statuses)
             else:
                 elem.handle_when_dead(neighs_statuses)
+
+
+class ArrayLattice:
+    """
+    Lattice keeping the board as a uint8 array of statuses (1 alive, 0 dead).
+    Whole generations are computed at once from shifted sums of a padded copy
+    of the board and written to a second buffer, so every cell sees the previous generation.
+    Edges are bounded (cells outside are dead) unless periodic is set.
+    """
+
+    def __init__(self, periodic=False):
+        self.grid = None
+        self.periodic = periodic
+        self._buffer = None
+        self._padded = None
+        self._counts = None
+
+    def initialize(self, n_rows, n_columns):
+        self.grid = np.zeros([n_rows, n_columns], dtype=np.uint8)
+        self._buffer = np.zeros_like(self.grid)
+        self._padded = np.zeros([n_rows + 2, n_columns + 2], dtype=np.uint8)
+        self._counts = np.zeros_like(self.grid)
+
+    def get_state(self):
+        return self.grid
+
+    def is_empty(self):
+        return not self.grid.any()
+
+    def fingerprint(self):
+        return StateHistory.fingerprint(self.grid)
+
+    def set_state(self, states):
+        self.grid[...] = np.asarray(states, dtype=bool)
+
+    def change_state(self):
+        counts = self._count_neighbours()
+        alive = np.equal(counts, 3)
+        alive |= np.equal(counts, 2) & self.grid.astype(bool)
+        self._buffer[...] = alive
+        self.grid, self._buffer = self._buffer, self.grid
+
+    def _count_neighbours(self):
+        n_rows, n_columns = self.grid.shape
+        padded, counts = self._padded, self._counts
+        padded[1:-1, 1:-1] = self.grid
+        if self.periodic:
+            padded[0, 1:-1] = self.grid[-1]
+            padded[-1, 1:-1] = self.grid[0]
+            padded[:, 0] = padded[:, -2]
+            padded[:, -1] = padded[:, 1]
+        counts.fill(0)
+        for a in range(3):
+            for b in range(3):
+                if (a, b) != (1, 1):
+                    counts += padded[a:a + n_rows, b:b + n_columns]
+        return counts
+
+
+class BitLattice:
+    """
+    Lattice packing 64 cells into every uint64 word, each row being an array of words
+    (column j is bit j % 64 of word j // 64). A generation is computed for whole words at once:
+    the eight shifted neighbour planes are summed with a bitwise adder and the B3/S23 rule
+    is applied to the resulting count bits.
+    """
+
+    def __init__(self, periodic=False):
+        self.grid = None
+        self.periodic = periodic
+        self._n_columns = 0
+        self._mask = None
+
+    def initialize(self, n_rows, n_columns):
+        n_words = (n_columns + 63) // 64
+        self.grid = np.zeros([n_rows, n_words], dtype=np.uint64)
+        self._n_columns = n_columns
+        self._mask = np.full(n_words, ~np.uint64(0), dtype=np.uint64)
+        if n_columns % 64:
+            self._mask[-1] = (np.uint64(1) << np.uint64(n_columns % 64)) - np.uint64(1)
+
+    def get_state(self):
+        as_bytes = self.grid.astype('<u8').view(np.uint8)
+        return np.unpackbits(as_bytes, axis=1, bitorder='little')[:, :self._n_columns]
+
+    def is_empty(self):
+        return not self.grid.any()
+
+    def fingerprint(self):
+        """
+        Hashes the packed words directly, without unpacking the board.
+        """
+        return get_fingerprint(self.grid, (self.grid.shape[0], self._n_columns))
+
+    def set_state(self, states):
+        states = np.asarray(states, dtype=bool)
+        padded = np.zeros([states.shape[0], self.grid.shape[1] * 64], dtype=bool)
+        padded[:, :self._n_columns] = states
+        self.grid[...] = np.packbits(padded, axis=1, bitorder='little').view('<u8')
+
+    def change_state(self):
+        grid = self.grid
+        rows = [self._shift_rows(grid, 1), grid, self._shift_rows(grid, -1)]
+        ones = np.zeros_like(grid)
+        twos = np.zeros_like(grid)
+        fours = np.zeros_like(grid)
+        for row in rows:
+            for plane in (self._shift_west(row), row, self._shift_east(row)):
+                if plane is grid:
+                    continue
+                carry = ones & plane
+                ones ^= plane
+                carry_twos = twos & carry
+                twos ^= carry
+                fours ^= carry_twos
+        self.grid = twos & ~fours & (ones | grid) & self._mask
+
+    def _shift_rows(self, words, shift):
+        if self.periodic:
+            return np.roll(words, shift, axis=0)
+        shifted = np.zeros_like(words)
+        if shift > 0:
+            shifted[shift:] = words[:-shift]
+        else:
+            shifted[:shift] = words[-shift:]
+        return shifted
+
+    def _shift_west(self, words):
+        """
+        Moves every cell one column right, so that bit j holds the neighbour from column j - 1.
+        """
+        shifted = words << np.uint64(1)
+        shifted[:, 1:] |= words[:, :-1] >> np.uint64(63)
+        if self.periodic:
+            last = np.uint64((self._n_columns - 1) % 64)
+            shifted[:, 0] |= (words[:, -1] >> last) & np.uint64(1)
+        return shifted
+
+    def _shift_east(self, words):
+        """
+        Moves every cell one column left, so that bit j holds the neighbour from column j + 1.
+        """
+        shifted = words >> np.uint64(1)
+        shifted[:, :-1] |= words[:, 1:] << np.uint64(63)
+        if self.periodic:
+            last = np.uint64((self._n_columns - 1) % 64)
+            shifted[:, -1] |= (words[:, 0] & np.uint64(1)) << last
+        return shifted
+
+
+class SparseLattice(ArrayLattice):
+    """
+    Array lattice re-evaluating only cells that changed in the previous generation and their neighbours.
+    Falls back to the dense step when the active cells are more than dense_fraction of the board.
+    Number of evaluated cells per generation is stored in active_counts.
+    """
+
+    def __init__(self, periodic=False, dense_fraction=0.2):
+        super().__init__(periodic)
+        self.dense_fraction = dense_fraction
+        self.active_counts = []
+        self._active = None
+
+    def set_state(self, states):
+        super().set_state(states)
+        self._active = None
+
+    def change_state(self):
+        n_cells = self.grid.size
+        if self._active is None or len(self._active) > self.dense_fraction * n_cells:
+            self.active_counts.append(n_cells)
+            super().change_state()
+            changed = np.flatnonzero(self.grid != self._buffer)
+        else:
+            active = self._active
+            self.active_counts.append(len(active))
+            flat = self.grid.reshape(-1)
+            neighbours, inside = self._get_neighbourhood(active, include_self=False)
+            counts = (flat[neighbours] & inside).sum(axis=1)
+            new = (counts == 3) | ((counts == 2) & flat[active].astype(bool))
+            changed = active[new != flat[active].astype(bool)]
+            flat[changed] ^= 1
+        self._active = np.unique(self._get_neighbourhood(changed, include_self=True)[0])
+
+    def _get_neighbourhood(self, indices, include_self):
+        """
+        Gets flat indices of neighbours of the given cells, one row per cell, and a mask
+        of neighbours lying inside the board. Neighbours outside of bounded edges are replaced by the cell itself.
+        """
+        n_rows, n_columns = self.grid.shape
+        rows, columns = np.divmod(indices, n_columns)
+        offsets = [(a, b) for a in (-1, 0, 1) for b in (-1, 0, 1) if include_self or (a, b) != (0, 0)]
+        neighbours = np.empty([len(indices), len(offsets)], dtype=np.intp)
+        inside = np.ones([len(indices), len(offsets)], dtype=np.uint8)
+        for k, (a, b) in enumerate(offsets):
+            x, y = rows + a, columns + b
+            if self.periodic:
+                neighbours[:, k] = (x % n_rows) * n_columns + y % n_columns
+            else:
+                inside[:, k] = (x >= 0) & (x < n_rows) & (y >= 0) & (y < n_columns)
+                neighbours[:, k] = np.where(inside[:, k], x * n_columns + y, indices)
+        return neighbours, inside
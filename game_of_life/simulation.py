@@ -1,78 +1,73 @@
 #Authors: Karolina Ostrowska, Aleksandra Sawczuk
-from lattice import Lattice
-from random import random
-from PIL import Image
-import glob
-import os
+from lattice import Lattice, ArrayLattice, BitLattice, SparseLattice
+from hashlife import HashLife
+from history import StateHistory
+from frames import GifWriter, AsyncSink
 import numpy as np
 import matplotlib.pyplot as plt
 
+LATTICES = {'object': Lattice, 'array': ArrayLattice, 'bit': BitLattice, 'sparse': SparseLattice,
+            'hashlife': HashLife}
+PALETTE = [(68, 1, 84), (253, 231, 37)]
 
-def simulate_game(n_rows, n_columns, probability, max_iteration=50):
-    lattice = get_starting_state(n_rows, n_columns, probability)
-    stop, iteration = False, 1
+
+def simulate_game(n_rows, n_columns, probability, max_iteration=50, engine='object', periodic=False, history=100,
+                  sink=None, rng=None):
+    lattice = get_starting_state(n_rows, n_columns, probability, engine, periodic, rng)
+    if sink:
+        sink.append(lattice.get_state())
+    states = StateHistory(size=history)
+    states.add(lattice, 1)
+    stop, iteration, period = False, 1, 0
     while not stop:
         lattice.change_state()
         iteration += 1
-        statuses = []
-        for row in lattice.grid:
-            statuses = statuses + [i.is_alive() for i in row]
-        stop = any([sum(statuses) == 0, max_iteration==iteration])
-        plot_frame(lattice.grid, str(iteration))
+        if lattice.is_empty():
+            period = 1
+        elif history:
+            period = states.add(lattice, iteration)
+        stop = any([period, max_iteration==iteration])
+        if sink:
+            sink.append(lattice.get_state())
+    return lattice, period
+
+
+def get_starting_state(n_rows, n_columns, probability, engine='object', periodic=False, rng=None):
+    if periodic and engine in ['object', 'hashlife']:
+        raise ValueError("periodic edges are not supported by the {} engine".format(engine))
+    lattice = LATTICES[engine](periodic=periodic) if periodic else LATTICES[engine]()
+    lattice.initialize(n_rows, n_columns)
+    lattice.set_state(_draw_statuses(n_rows, n_columns, probability, rng))
+    return lattice
 
 
-def get_starting_state(n_rows, n_columns, probability):
-    lattice = Lattice()
+def jump_game(n_rows, n_columns, probability, generations, cache_size=2 ** 20, rng=None):
+    lattice = HashLife(cache_size=cache_size)
     lattice.initialize(n_rows, n_columns)
-    grid = lattice.grid
-    for cell_list in grid:
-        for cell in cell_list:
-            if random() < probability:
-                cell.set_alive()
-    plot_frame(lattice.grid, "1")
+    lattice.set_state(_draw_statuses(n_rows, n_columns, probability, rng))
+    lattice.advance(generations)
+    plot_frame(lattice.get_state(), str(generations + 1))
     return lattice
 
 
 def plot_frame(grid, name):
-    frame = []
-    for cell_list in grid:
-        row = []
-        for cell in cell_list:
-            row.append(cell.is_alive())
-        frame.append(row)
-    plt.matshow(np.array(frame))
+    if grid.dtype == object:
+        grid = np.vectorize(lambda cell: cell.is_alive(), otypes=[np.uint8])(grid)
+    plt.matshow(grid)
     plt.savefig(name)
+    plt.close()
 
 
-def make_and_save_gif(n_rows, n_columns, probability):
-    _del_remained_pngs()
-    simulate_game(n_rows, n_columns, probability)
-    _gif()
-
-
-def _gif():
-    frames = []
-    imgs = _sort_pngs()
-    for i in imgs:
-        new_frame = Image.open(i)
-        frames.append(new_frame)
-    frames[0].save('game.gif', format='GIF', append_images=frames[1:], save_all=True, duration=500, loop=0)
-
-
-def _del_remained_pngs():
-    path = os.getcwd()
-    for file in os.listdir(path):
-        if file.endswith('.png'):
-            os.remove(file)
-
+def make_and_save_gif(n_rows, n_columns, probability, engine='object', periodic=False, rng=None):
+    with AsyncSink(GifWriter('game.gif', PALETTE, duration=500)) as sink:
+        simulate_game(n_rows, n_columns, probability, engine=engine, periodic=periodic, sink=sink, rng=rng)
 
-def _sort_names(name):
-    return int(''.join(filter(str.isdigit, name)))
 
+def _draw_statuses(n_rows, n_columns, probability, rng=None):
+    """
+    Draws alive cells with one bulk draw; rng can be a numpy Generator, a seed or None.
+    """
+    return np.random.default_rng(rng).random([n_rows, n_columns]) < probability
 
-def _sort_pngs():
-    imgs = glob.glob("*.png")
-    imgs.sort(key=_sort_names)
-    return imgs
 
-#make_and_save_gif(n_rows=100, n_columns=75, probability=0.1)
\ No newline at end of file
+#make_and_save_gif(n_rows=100, n_columns=75, probability=0.1)
@@ -0,0 +1,39 @@
+import numpy as np
+from pytest import mark
+from lattice import ArrayLattice
+from hashlife import HashLife
+
+
+def _soup(size, seed, soup_size=12):
+    statuses = np.zeros([size, size], dtype=np.uint8)
+    start = (size - soup_size) // 2
+    rng = np.random.default_rng(seed)
+    statuses[start:start + soup_size, start:start + soup_size] = rng.random([soup_size, soup_size]) < 0.4
+    return statuses
+
+
+@mark.parametrize("generations", [1, 7, 30])
+@mark.parametrize("cache_size", [2 ** 20, 16])
+def test_advance_matches_array_lattice(generations, cache_size):
+    statuses = _soup(120, seed=generations)
+    array, hashlife = ArrayLattice(), HashLife(cache_size=cache_size)
+    for lattice in (array, hashlife):
+        lattice.initialize(120, 120)
+        lattice.set_state(statuses)
+    for _ in range(generations):
+        array.change_state()
+    hashlife.advance(generations)
+    np.testing.assert_array_equal(hashlife.get_state(), array.get_state())
+    assert hashlife.generation == generations
+
+
+def test_glider_after_many_generations():
+    hashlife = HashLife()
+    hashlife.initialize(5, 5)
+    glider = np.zeros([5, 5], dtype=np.uint8)
+    glider[0, 1] = glider[1, 2] = 1
+    glider[2, 0:3] = 1
+    hashlife.set_state(glider)
+    hashlife.advance(4 * 10 ** 6)
+    np.testing.assert_array_equal(hashlife.get_window(10 ** 6, 10 ** 6, 5, 5), glider)
+    assert hashlife.root.population == 5
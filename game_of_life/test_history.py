@@ -0,0 +1,56 @@
+import numpy as np
+from lattice import ArrayLattice, BitLattice
+from history import StateHistory
+
+
+def _run(statuses, history, generations=20):
+    lattice = ArrayLattice()
+    lattice.initialize(*statuses.shape)
+    lattice.set_state(statuses)
+    states = StateHistory(size=history)
+    states.add(lattice, 1)
+    for iteration in range(2, generations):
+        lattice.change_state()
+        period = states.add(lattice, iteration)
+        if period:
+            return iteration, period
+    return None
+
+
+def test_still_life_detected():
+    statuses = np.zeros([6, 6], dtype=np.uint8)
+    statuses[2:4, 2:4] = 1
+    assert _run(statuses, history=10) == (2, 1)
+
+
+def test_oscillator_period():
+    statuses = np.zeros([5, 5], dtype=np.uint8)
+    statuses[2, 1:4] = 1
+    assert _run(statuses, history=10) == (3, 2)
+
+
+def test_history_is_bounded():
+    statuses = np.zeros([5, 5], dtype=np.uint8)
+    statuses[2, 1:4] = 1
+    assert _run(statuses, history=1) is None
+
+
+def test_fingerprint_depends_on_shape():
+    assert StateHistory.fingerprint(np.zeros([2, 8], dtype=np.uint8)) != \
+        StateHistory.fingerprint(np.zeros([4, 4], dtype=np.uint8))
+
+
+def test_bit_lattice_is_checked_without_unpacking():
+    statuses = np.zeros([6, 70], dtype=np.uint8)
+    statuses[2, 65:68] = 1
+    lattice = BitLattice()
+    lattice.initialize(*statuses.shape)
+    lattice.set_state(statuses)
+    lattice.get_state = None
+    states = StateHistory(size=10)
+    assert not lattice.is_empty() and states.add(lattice, 1) == 0
+    lattice.change_state()
+    lattice.change_state()
+    assert states.add(lattice, 3) == 2
+    lattice.set_state(np.zeros_like(statuses))
+    assert lattice.is_empty()
@@ -0,0 +1,94 @@
+import numpy as np
+from pytest import mark
+from lattice import Lattice, ArrayLattice, BitLattice, SparseLattice
+
+
+def reference_step(statuses):
+    n_rows, n_columns = statuses.shape
+    new = np.zeros_like(statuses)
+    for a in range(n_rows):
+        for b in range(n_columns):
+            alive = 0
+            for x in range(max(a - 1, 0), min(a + 2, n_rows)):
+                for y in range(max(b - 1, 0), min(b + 2, n_columns)):
+                    if (x, y) != (a, b):
+                        alive += statuses[x, y]
+            new[a, b] = alive == 3 or (statuses[a, b] and alive == 2)
+    return new
+
+
+def _random_statuses(shape, seed, probability=0.3):
+    return (np.random.default_rng(seed).random(shape) < probability).astype(np.uint8)
+
+
+@mark.parametrize("lattice_class", [Lattice, ArrayLattice, BitLattice, SparseLattice])
+@mark.parametrize("shape, seed", [((12, 12), 0), ((9, 17), 1), ((1, 5), 2)])
+def test_change_state_matches_reference(lattice_class, shape, seed):
+    statuses = _random_statuses(shape, seed)
+    lattice = lattice_class()
+    lattice.initialize(*shape)
+    lattice.set_state(statuses)
+    for _ in range(5):
+        statuses = reference_step(statuses)
+        lattice.change_state()
+        np.testing.assert_array_equal(lattice.get_state(), statuses)
+
+
+def test_array_lattice_blinker():
+    lattice = ArrayLattice()
+    lattice.initialize(5, 5)
+    lattice.grid[2, 1:4] = 1
+    lattice.change_state()
+    expected = np.zeros([5, 5], dtype=np.uint8)
+    expected[1:4, 2] = 1
+    np.testing.assert_array_equal(lattice.get_state(), expected)
+
+
+@mark.parametrize("periodic", [False, True])
+@mark.parametrize("shape, seed", [((20, 64), 3), ((15, 70), 4), ((7, 130), 5), ((3, 1), 6)])
+def test_bit_lattice_matches_array_lattice(periodic, shape, seed):
+    statuses = _random_statuses(shape, seed, probability=0.4)
+    bit, array = BitLattice(periodic=periodic), ArrayLattice(periodic=periodic)
+    for lattice in (bit, array):
+        lattice.initialize(*shape)
+        lattice.set_state(statuses)
+    for _ in range(10):
+        bit.change_state()
+        array.change_state()
+        np.testing.assert_array_equal(bit.get_state(), array.get_state())
+
+
+def test_periodic_glider_returns_after_wrapping():
+    lattice = ArrayLattice(periodic=True)
+    lattice.initialize(8, 8)
+    lattice.grid[0, 1] = lattice.grid[1, 2] = 1
+    lattice.grid[2, 0:3] = 1
+    start = lattice.get_state().copy()
+    for _ in range(32):
+        lattice.change_state()
+    np.testing.assert_array_equal(lattice.get_state(), start)
+
+
+@mark.parametrize("periodic", [False, True])
+@mark.parametrize("dense_fraction", [0.0, 0.2, 1.0])
+def test_sparse_lattice_matches_array_lattice(periodic, dense_fraction):
+    statuses = _random_statuses((40, 33), seed=7, probability=0.35)
+    sparse, array = SparseLattice(periodic=periodic, dense_fraction=dense_fraction), ArrayLattice(periodic=periodic)
+    for lattice in (sparse, array):
+        lattice.initialize(40, 33)
+        lattice.set_state(statuses)
+    for _ in range(60):
+        sparse.change_state()
+        array.change_state()
+        np.testing.assert_array_equal(sparse.get_state(), array.get_state())
+    assert len(sparse.active_counts) == 60
+
+
+def test_sparse_lattice_tracks_only_active_region():
+    lattice = SparseLattice()
+    lattice.initialize(100, 100)
+    lattice.grid[50, 49:52] = 1
+    for _ in range(4):
+        lattice.change_state()
+    assert lattice.active_counts[0] == 100 * 100
+    assert max(lattice.active_counts[1:]) <= 25
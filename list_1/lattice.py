@@ -1,5 +1,9 @@
 import numpy as np
-from trees import Tree
+from union_find import UnionFind
+
+OPPOSITE_EDGES = {'left': 'right', 'right': 'left', 'top': 'bottom', 'bottom': 'top'}
+EDGE_INDICES = {'left': (Ellipsis, slice(None), 0), 'right': (Ellipsis, slice(None), -1),
+                'top': (Ellipsis, 0, slice(None)), 'bottom': (Ellipsis, -1, slice(None))}
 
 
 class Lattice:
@@ -12,17 +16,48 @@ class Lattice:
         Changes state of the lattice: burning trees get burnt, neighbours of burning trees catch fire,
         :return: list of burning trees
         """
-        trees, burning = self._check_state()
-        trees = trees.tolist()
-        for cord in burning:
-            self.grid[cord[0], cord[1]] = 3
-            tree = Tree()
-            tree._configure(place=cord)
-            neigh = tree._get_regular_neighbours()
-            for neighbour in neigh:
-                if neighbour in trees:
-                    self.grid[neighbour[0], neighbour[1]] = 2
-        return burning
+        burning = self.grid == 2
+        ignited = self._get_neighbourhood(burning) & (self.grid == 1)
+        self.grid[burning] = 3
+        self.grid[ignited] = 2
+        return np.argwhere(burning)
+
+    def solve_fire(self, edge=None):
+        """
+        Computes the whole fire at once with breadth-first search from the burning trees
+        (frontier of every step is kept as an array of flat indices). Leaves the lattice
+        in the same state as calling change_state until nothing burns.
+        :param edge: edge of the lattice where the fire started, used to check the opposite edge
+        :return: mask of burnt trees, array with the step in which every tree caught fire (-1 if it did not,
+        0 for trees burning at the start), True if any tree on the edge opposite to edge has been burnt
+        """
+        n_rows, n_columns = self.grid.shape
+        flat = self.grid.reshape(-1)
+        unburnt = flat == 1
+        ignition_time = np.full(flat.size, -1)
+        frontier = np.flatnonzero(flat == 2)
+        ignition_time[frontier] = 0
+        offsets = [(a, b) for a in (-1, 0, 1) for b in (-1, 0, 1) if (a, b) != (0, 0)]
+        step = 0
+        while len(frontier):
+            step += 1
+            rows, columns = np.divmod(frontier, n_columns)
+            candidates = []
+            for a, b in offsets:
+                x, y = rows + a, columns + b
+                inside = (x >= 0) & (x < n_rows) & (y >= 0) & (y < n_columns)
+                candidates.append((x * n_columns + y)[inside])
+            candidates = np.unique(np.concatenate(candidates))
+            frontier = candidates[unburnt[candidates]]
+            unburnt[frontier] = False
+            ignition_time[frontier] = step
+        burnt = (ignition_time >= 0).reshape(n_rows, n_columns)
+        self.grid[burnt] = 3
+        reached = False
+        if edge is not None:
+            opposite = np.array(self.get_opposite_edge(edge))
+            reached = bool(burnt[opposite[:, 0], opposite[:, 1]].any())
+        return burnt, ignition_time.reshape(n_rows, n_columns), reached
 
     def start_fire(self, edge):
         """
@@ -55,81 +90,87 @@ class Lattice:
         :param edge_cord: list of coordinates for points on the edge
         :return: True if any tree on the given edge has been burnt, else false
         """
-        trees = np.argwhere(self.grid == 3).tolist()
-        return True if any((cord in trees for cord in edge_cord)) else False
+        edge_cord = np.array(edge_cord)
+        return bool((self.grid[edge_cord[:, 0], edge_cord[:, 1]] == 3).any())
 
-    def hoshen_kopelman(self):
+    def percolates(self, edge, early_exit=True):
         """
-        Performs clustering using hashen kopelman alghoritm
-        :return: distionary with trees and clusters to which they have been assigned
+        Checks without simulating the fire whether it would get from the given edge to the opposite one,
+        that is whether trees on both edges belong to the same cluster of regular (8) neighbours.
+        Trees are joined in raster order in a union-find structure together with two virtual nodes for the edges.
+        :param edge: edge of the lattice where the fire starts
+        :param early_exit: if True the scan stops after the first row in which the edges got connected
+        :return: True if a cluster spans from the edge to the opposite one, else false
         """
-        burnt, trees = self._get_burnt_trees()
-        c = 0
-        for tree in trees.keys():
-            neighs = tree._get_neumann_neighbours()
-            if tree.cluster_type != None:
-                self._handle_when_cluster_not_none(neighs, trees, tree)
-            else:
-                clusters_neigh = self._get_clusters_of_neighbours(neighs, trees)
-
-                if len(set(clusters_neigh)) > 1:
-                    self._handle_when_cluster_none_and_diff_neighbours(trees, tree, clusters_neigh)
-
-                elif len(set(clusters_neigh)) == 1:
-                    tree.cluster_type = clusters_neigh[0]
-
-                elif len(set(clusters_neigh)) == 0:
-                    tree.cluster_type = c
-                    c += 1
-
-        return trees
-
-    def _get_burnt_trees(self):
-        burnt = np.argwhere(self.grid == 3).tolist()
-        trees = {}
-        for i in range(len(burnt)):
-            tree = Tree()
-            tree._configure(place=burnt[i])
-            trees[tree] = burnt[i]
-        return burnt, trees
-
-    @staticmethod
-    def _handle_when_cluster_none_and_diff_neighbours(trees, tree, clusters_neigh):
-        tree.cluster_type = clusters_neigh[0]
-        cluster_set = set(clusters_neigh)
-        cluster_set.remove(tree.cluster_type)
-        for k, v in trees.items():
-            for cl_t in cluster_set:
-                if k.cluster_type == cl_t:
-                    k.cluster_type = tree.cluster_type
-
-    @staticmethod
-    def _get_clusters_of_neighbours(neighs, trees):
-        clusters_neigh = []
-        for n in neighs:
-            try:
-                neigh = [k for k, v in trees.items() if v == n][0]
-                if neigh.cluster_type != None:
-                    clusters_neigh.append(neigh.cluster_type)
-            except IndexError:
-                neigh = None
-        return clusters_neigh
+        n_rows, n_columns = self.grid.shape
+        occupied = (self.grid > 0).reshape(-1).tolist()
+        source, target = n_rows * n_columns, n_rows * n_columns + 1
+        clusters = UnionFind(n_rows * n_columns + 2)
+        for x, y in self._edge_to_cord(edge):
+            if occupied[x * n_columns + y]:
+                clusters.union(source, x * n_columns + y)
+        for x, y in self.get_opposite_edge(edge):
+            if occupied[x * n_columns + y]:
+                clusters.union(target, x * n_columns + y)
+        visited = [(-1, -1), (-1, 0), (-1, 1), (0, -1)]
+        for row in range(n_rows):
+            for column in range(n_columns):
+                cell = row * n_columns + column
+                if not occupied[cell]:
+                    continue
+                for a, b in visited:
+                    x, y = row + a, column + b
+                    if x >= 0 and 0 <= y < n_columns and occupied[x * n_columns + y]:
+                        clusters.union(cell, x * n_columns + y)
+            if early_exit and clusters.find(source) == clusters.find(target):
+                return True
+        return clusters.find(source) == clusters.find(target)
+
+    def hoshen_kopelman(self, state=3, connectivity=4):
+        """
+        Performs clustering using Hoshen-Kopelman algorithm: cells are scanned in raster order
+        and joined with already visited neighbours in a union-find structure.
+        :param state: state of cells which are clustered (burnt trees by default)
+        :param connectivity: 4 for Neumann's neighbours, 8 for regular neighbours
+        :return: array of cluster labels (0 where there is no cell in the given state, clusters numbered from 1),
+        array of cluster sizes, where element k - 1 is the size of cluster k, and histogram of cluster sizes,
+        where element s is the number of clusters of size s
+        """
+        n_rows, n_columns = self.grid.shape
+        occupied = (self.grid == state).reshape(-1)
+        clusters = UnionFind(occupied.size)
+        visited = [(-1, 0), (0, -1)] if connectivity == 4 else [(-1, -1), (-1, 0), (-1, 1), (0, -1)]
+        cells = np.flatnonzero(occupied).tolist()
+        is_occupied = occupied.tolist()
+        for cell in cells:
+            row, column = divmod(cell, n_columns)
+            for a, b in visited:
+                x, y = row + a, column + b
+                if x >= 0 and 0 <= y < n_columns and is_occupied[x * n_columns + y]:
+                    clusters.union(cell, x * n_columns + y)
+        labels = np.zeros(occupied.size, dtype=int)
+        roots = [clusters.find(cell) for cell in cells]
+        if cells:
+            _, labels[cells] = np.unique(roots, return_inverse=True)
+            labels[cells] += 1
+        sizes = np.bincount(labels)[1:]
+        return labels.reshape(n_rows, n_columns), sizes, np.bincount(sizes)
 
     @staticmethod
-    def _handle_when_cluster_not_none(neighs, trees, tree):
-        for n in neighs:
-            try:
-                neigh = [k for k, v in trees.items() if v == n][0]
-                if neigh.cluster_type != tree.cluster_type:
-                    neigh.cluster_type = tree.cluster_type
-                    cluster_group = [k for k, v in trees.items() if k.cluster_type == neigh.cluster_type]
-                    for elem in cluster_group:
-                        elem.cluster_type = tree.cluster_type
-            except IndexError:
-                neigh = None
-
-    def _check_state(self):
-        return np.argwhere(self.grid == 1), np.argwhere(self.grid == 2)
+    def _get_neighbourhood(mask):
+        """
+        Marks cells having at least one of 8 regular neighbours set in mask (without periodic boundary).
+        Works on the last two axes, so a stack of lattices can be passed at once.
+        :param mask: boolean array
+        :return: boolean array of the same shape
+        """
+        neighbourhood = np.zeros_like(mask)
+        neighbourhood[..., 1:, :] |= mask[..., :-1, :]
+        neighbourhood[..., :-1, :] |= mask[..., 1:, :]
+        vertical = mask | neighbourhood
+        neighbourhood[..., :, 1:] |= vertical[..., :, :-1]
+        neighbourhood[..., :, :-1] |= vertical[..., :, 1:]
+        return neighbourhood
 
     def _edge_to_cord(self, edge):
         if edge == 'left':
@@ -143,3 +184,56 @@ class Lattice:
 
     def _configure(self, size):
         self.grid = np.zeros(shape=[size, size])
+
+
+class BatchLattice(Lattice):
+    """
+    Stack of independent squared lattices (replicas) kept in one array of shape (replicas, size, size),
+    on which fires are advanced together.
+    """
+
+    def generate(self, size, p, replicas, rng=None):
+        """
+        Generates starting state of trees on all replicas with one draw.
+        :param size: size of the squared lattice
+        :param p: probability that a cell of the lattice is populated by a tree
+        :param replicas: number of lattices
+        :param rng: random generator or seed
+        :type rng: numpy Generator, int or None
+        """
+        rng = np.random.default_rng(rng)
+        self.grid = (rng.random([replicas, size, size]) < p).astype(np.int8)
+
+    def start_fire(self, edge):
+        """
+        Starts fire on the given edge of all replicas
+        :param edge: edge of the lattice where fire should start
+        """
+        cells = self.grid[EDGE_INDICES[edge]]
+        cells[cells == 1] = 2
+
+    def burn(self):
+        """
+        Advances fires on all replicas until nothing burns. Only replicas that still burn are updated in every step.
+        :return: number of steps
+        """
+        active = np.flatnonzero((self.grid == 2).any(axis=(1, 2)))
+        steps = 0
+        while len(active):
+            grid = self.grid[active]
+            burning = grid == 2
+            ignited = self._get_neighbourhood(burning) & (grid == 1)
+            grid[burning] = 3
+            grid[ignited] = 2
+            self.grid[active] = grid
+            active = active[ignited.any(axis=(1, 2))]
+            steps += 1
+        return steps
+
+    def reached_opposite_edge(self, edge):
+        """
+        Checks for every replica if any tree on the edge opposite to the given one has been burnt.
+        :param edge: edge of the lattice where fire started
+        :return: boolean array, one value per replica
+        """
+        return (self.grid[EDGE_INDICES[OPPOSITE_EDGES[edge]]] == 3).any(axis=-1)
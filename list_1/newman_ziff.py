@@ -0,0 +1,95 @@
+from functools import partial
+import numpy as np
+from lattice import Lattice
+from union_find import UnionFind
+from sweep import run_sweep
+
+
+def occupation_sweep(size, edge='left', order=None, rng=None):
+    """
+    Adds trees to an empty lattice one at a time in random order (Newman-Ziff algorithm) and keeps clusters
+    of regular (8) neighbours in a union-find structure, so one pass gives results for every number of trees.
+    :param size: size of the squared lattice
+    :param edge: edge of lattice where the fire starts
+    :param order: order in which cells get trees (flat indices), random permutation by default
+    :param rng: random generator or seed used for the permutation
+    :return: arrays indexed by number of trees (0 to size**2): True if a cluster spans from the edge
+    to the opposite one, size of the biggest cluster
+    """
+    n_cells = size * size
+    order = np.random.default_rng(rng).permutation(n_cells) if order is None else order
+    lattice = Lattice()
+    lattice._configure(size=size)
+    flags = [0] * n_cells
+    for x, y in lattice._edge_to_cord(edge):
+        flags[x * size + y] |= 1
+    for x, y in lattice.get_opposite_edge(edge):
+        flags[x * size + y] |= 2
+    clusters = UnionFind(n_cells)
+    occupied = [False] * n_cells
+    offsets = [(a, b) for a in (-1, 0, 1) for b in (-1, 0, 1) if (a, b) != (0, 0)]
+    spanning = np.zeros(n_cells + 1, dtype=bool)
+    biggest = np.zeros(n_cells + 1, dtype=int)
+    spans, largest = False, 0
+    for n, cell in enumerate(order.tolist(), start=1):
+        occupied[cell] = True
+        row, column = divmod(cell, size)
+        root = cell
+        for a, b in offsets:
+            x, y = row + a, column + b
+            if 0 <= x < size and 0 <= y < size and occupied[x * size + y]:
+                other = clusters.find(x * size + y)
+                if other != root:
+                    flag = flags[root] | flags[other]
+                    root = clusters.union(root, other)
+                    flags[root] = flag
+        spans = spans or flags[root] == 3
+        largest = max(largest, clusters.size[root])
+        spanning[n], biggest[n] = spans, largest
+    return spanning, biggest
+
+
+def newman_ziff(size=20, edge='left', N=100, p_list=None, processes=1, seed=None):
+    """
+    Calculates probability of the fire getting to the opposite edge and average size of the biggest cluster
+    of trees for every p, from N occupation sweeps weighted with binomial distribution of the number of trees.
+    :param size: size of the squared lattice
+    :param edge: edge of lattice where the fire starts
+    :param N: number of monte carlo iterations
+    :param p_list: values of p, 100 points from 0 to 1 by default
+    :param processes: number of processes running the sweeps, None uses all cores
+    :param seed: seed of the random streams of the sweeps
+    :return: list of p, list of probabilities of the fire getting to the opposite edge, list of biggest cluster sizes
+    """
+    p_list = np.linspace(0, 1, 100) if p_list is None else np.asarray(p_list)
+    result = run_sweep(partial(_sweep_run, size=size, edge=edge), [None], repetitions=N, processes=processes,
+                       seed=seed)
+    spanning, biggest = result.mean[0]
+    weights = _binomial_weights(size * size, p_list)
+    return p_list, list(weights @ spanning), list(weights @ biggest)
+
+
+def _sweep_run(_, rng, size, edge):
+    """
+    One task of the monte carlo sweep: single occupation sweep stacked into one array.
+    """
+    return np.stack(occupation_sweep(size, edge, rng=rng))
+
+
+def _binomial_weights(n_cells, p_list):
+    """
+    Gets probabilities of every number of trees for every p.
+    :param n_cells: number of cells of the lattice
+    :param p_list: values of p
+    :return: array of shape (len(p_list), n_cells + 1)
+    """
+    n = np.arange(n_cells + 1)
+    log_factorial = np.concatenate([[0], np.cumsum(np.log(np.arange(1, n_cells + 1)))])
+    log_binomial = log_factorial[-1] - log_factorial - log_factorial[::-1]
+    weights = np.zeros([len(p_list), n_cells + 1])
+    for k, p in enumerate(p_list):
+        if p <= 0 or p >= 1:
+            weights[k, n == round(n_cells * p)] = 1
+        else:
+            weights[k] = np.exp(log_binomial + n * np.log(p) + (n_cells - n) * np.log1p(-p))
+    return weights
@@ -1,80 +1,148 @@
-import random
-import os
-import glob
+from functools import partial
 import numpy as np
-from PIL import Image
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
-from collections import Counter
-from trees import Tree
-from lattice import Lattice
+from lattice import Lattice, BatchLattice
+from newman_ziff import newman_ziff
+from threshold import estimate_p_threshold
+from frames import GifWriter, AsyncSink
+from sweep import run_sweep, run_sequential
 
+PALETTE = [(210, 180, 140), (0, 128, 0), (255, 0, 0), (128, 128, 128)]
 
-def simulate(size, p, edge='left', gif=False, clusters=False):
+
+def simulate(size, p, edge='left', gif=False, clusters=False, sink=None, solver='bfs', rng=None):
     """
     Simulates fire on lattice.
     :param size: size of the squared lattice
     :param p: probability for every cell that it will be populated by a tree
     :param edge: edge of lattice where the fire starts
-    :param gif: boolean value if gif of the simulation should be made
+    :param gif: boolean value if gif of the simulation should be made (saved to fire.gif)
     :param clusters: boolean value if clustering using hoshen kopelman algorithm should be made
-    :return: boolean if the fire got to the opposite edge
+    :param sink: frame sink receiving the grid in every step, not used together with gif
+    :type sink: FrameSink or None
+    :param solver: 'bfs' computes the whole fire in one pass, 'steps' advances it step by step;
+    frames are recorded only step by step, so gif or sink always use 'steps'
+    :param rng: random generator or seed
+    :type rng: numpy Generator, int or None
+    :return: boolean if the fire got to the opposite edge, with clusters also array of sizes of burnt-tree clusters
     """
-    lattice = _generate_start_state_of_trees(size, p, gif)
-    opposite = lattice.get_opposite_edge(edge=edge)
+    if gif and sink:
+        raise ValueError("gif and sink cannot be used together")
+    sink = AsyncSink(GifWriter('fire.gif', PALETTE, duration=500)) if gif else sink
+    lattice = _generate_start_state_of_trees(size, p, sink, rng)
     lattice.start_fire(edge=edge)
-    if gif:
-        _del_remained_pngs()
-        plot_fire(lattice.grid, '1')
-    burning = lattice.change_state()
-    i = 2
-    while len(burning):
-        if gif:
-            plot_fire(lattice.grid, str(i))
+    if solver == 'bfs' and not sink:
+        _, _, burnt = lattice.solve_fire(edge=edge)
+    else:
+        opposite = lattice.get_opposite_edge(edge=edge)
+        if sink:
+            sink.append(lattice.grid)
         burning = lattice.change_state()
-        i += 1
+        while len(burning):
+            if sink:
+                sink.append(lattice.grid)
+            burning = lattice.change_state()
+        if gif:
+            sink.close()
+        burnt = lattice.check_if_burnt(edge_cord=opposite)
     if clusters:
-        trees = lattice.hoshen_kopelman()
-        cord, cluster = [], []
-        for tree in trees:
-            cord.append(tree.place)
-            cluster.append(tree.cluster_type)
-        return lattice.check_if_burnt(edge_cord=opposite), cluster
+        _, cluster_sizes, _ = lattice.hoshen_kopelman()
+        return burnt, cluster_sizes
 
-    return lattice.check_if_burnt(edge_cord=opposite)
+    return burnt
 
 
-def simulate_monte_carlo(size=20, edge='left', N=100):
+def simulate_monte_carlo(size=20, edge='left', N=100, method='batch', processes=1, seed=None, tol=None, budget=10000):
     """
     Simulates fire in a loop for different p
     :param size: size of the squared lattice
     :param edge: edge of lattice where the fire starts
     :param N: number of monte carlo iterations
-    :return: list of p, list of boolean values where every value says whether fire got to the opposite edge
+    :param method: 'batch' simulates N fires at once for every p, 'fire' simulates fires one by one,
+    'percolation' only checks if a cluster of trees spans both edges, 'newman_ziff' gets the whole curve
+    from N occupation sweeps, 'adaptive' refines the grid of p around the threshold (see estimate_p_threshold)
+    :param processes: number of processes running the simulations, None uses all cores ('adaptive' method
+    runs in one process only)
+    :param seed: seed of the random streams of the simulations ('adaptive' method uses one generator seeded with it)
+    :param tol: target standard error of the probability; if given, fires are simulated in batches of N for every p
+    until it is reached or budget fires were simulated ('batch', 'fire' and 'percolation' methods only)
+    :param budget: maximum number of fires per p when tol is given
+    :return: list of p, list of boolean values where every value says whether fire got to the opposite edge,
+    with tol also list of achieved standard errors
     """
-    burnt_per_p = []
+    if tol is not None:
+        if method not in ['batch', 'fire', 'percolation']:
+            raise ValueError("tol is not supported by the {} method".format(method))
+        p_list = np.linspace(0, 1, 100)
+        if method == 'batch':
+            result = run_sequential(partial(_burn_run, size=size, edge=edge, N=N), p_list, tol, batch=1,
+                                    budget=budget, processes=processes, seed=seed, stack=np.concatenate)
+        else:
+            result = run_sequential(partial(_fire_run, size=size, edge=edge, method=method), p_list, tol, batch=N,
+                                    budget=budget, processes=processes, seed=seed)
+        return p_list, [float(mean) for mean in result.mean], [float(error) for error in result.error]
+    if method == 'newman_ziff':
+        p_list, burnt_per_p, _ = newman_ziff(size=size, edge=edge, N=N, processes=processes, seed=seed)
+        return p_list, burnt_per_p
+    if method == 'adaptive':
+        if processes != 1:
+            raise ValueError("processes are not supported by the adaptive method")
+        p_list, burnt_per_p, _, _ = estimate_p_threshold(size=size, edge=edge, N=N, rng=seed)
+        return p_list, burnt_per_p
     p_list = np.linspace(0, 1, 100)
-    for p in p_list:
-        if_burnt = []
-        for n in range(N):
-            burnt = simulate(size=size, p=p, edge=edge)
-            if_burnt.append(burnt)
-        burnt_per_p.append(sum(if_burnt)/N)
+    if method == 'batch':
+        result = run_sweep(partial(_burn_probability_run, size=size, edge=edge, N=N), p_list, processes=processes,
+                           seed=seed)
+    else:
+        result = run_sweep(partial(_fire_run, size=size, edge=edge, method=method), p_list, repetitions=N,
+                           processes=processes, seed=seed)
+    burnt_per_p = [float(mean) for mean in result.mean]
 
     return p_list, burnt_per_p
 
 
-def draw_mc_per_p(size=20, edge='left', N=100):
+def burn_probability(size, p, edge='left', N=100, rng=None):
+    """
+    Simulates N fires at once on a stack of lattices.
+    :param size: size of the squared lattice
+    :param p: probability for every cell that it will be populated by a tree
+    :param edge: edge of lattice where the fire starts
+    :param N: number of lattices
+    :param rng: random generator or seed
+    :return: fraction of lattices on which the fire got to the opposite edge
+    """
+    return _burn_run(p, rng, size=size, edge=edge, N=N).mean()
+
+
+def check_percolation(size, p, edge='left', rng=None):
+    """
+    Checks if the fire would get to the opposite edge, without simulating it.
+    :param size: size of the squared lattice
+    :param p: probability for every cell that it will be populated by a tree
+    :param edge: edge of lattice where the fire starts
+    :param rng: random generator or seed
+    :return: boolean if a cluster of trees connects the edge with the opposite one
+    """
+    lattice = _generate_start_state_of_trees(size, p, rng=rng)
+    return lattice.percolates(edge=edge)
+
+
+def draw_mc_per_p(size=20, edge='left', N=100, method='batch'):
     """
     Makes plot of probability of the fire getting to the opposite edge for different p and marks threshold
     :param size: size of the squared lattice
     :param edge: edge of lattice where the fire starts
     :param N: number of monte carlo iterations
+    :param method: 'batch', 'fire', 'percolation', 'newman_ziff' or 'adaptive', see simulate_monte_carlo
     """
-    p_list, burnt_per_p = simulate_monte_carlo(size=size, edge=edge, N=N)
-    p_threshold = _get_p_threshold(burnt_per_p)
+    if method == 'adaptive':
+        p_list, burnt_per_p, p_threshold, _ = estimate_p_threshold(size=size, edge=edge, N=N)
+    else:
+        p_list, burnt_per_p = simulate_monte_carlo(size=size, edge=edge, N=N, method=method)
+        p_threshold = (_get_p_threshold(burnt_per_p)+1)/100
     plt.plot(p_list, burnt_per_p)
-    plt.plot((p_threshold+1)/100, 0, marker='o', label='p threshold')
+    plt.plot(p_threshold, 0, marker='o', label='p threshold')
     plt.title('p vs probability of the fire getting to the other end')
     plt.xlabel('p')
     plt.ylabel('q')
@@ -90,19 +158,6 @@ def make_and_save_gif(size=20, p=0.5, edge='left'):
     :param edge: edge of lattice where the fire starts
     """
     simulate(size=size, p=p, edge=edge, gif=True)
-    _gif()
-
-
-def _gif():
-    """
-    Creates a gif of fire spread on a lattice over time from saved pngs
-    """
-    frames = []
-    imgs = _sort_pngs()
-    for i in imgs:
-        new_frame = Image.open(i)
-        frames.append(new_frame)
-    frames[0].save('fire.gif', format='GIF', append_images=frames[1:], save_all=True, duration=500, loop=0)
 
 
 def plot_fire(grid, name):
@@ -114,83 +169,109 @@ def plot_fire(grid, name):
     cmap = ListedColormap(['tan', 'green', 'red', 'grey'])
     plt.matshow(grid, cmap=cmap, vmin=0, vmax=3)
     plt.savefig(name)
+    plt.close()
 
 
-def biggest_cluster_vs_p_MC(size=20, edge='left', N=100):
+def biggest_cluster_vs_p_MC(size=20, edge='left', N=100, method='fire', processes=1, seed=None):
     """
-    Calculates size of the biggest cluster in burnt trees on the lattice.
+    Calculates size of the biggest cluster in burnt trees on the lattice, or of all trees with 'newman_ziff' method.
     :param size: size of the squared lattice
     :param edge: edge of lattice where the fire starts
     :param N: number of monte carlo iterations
-    :return: list of p, list of cbiggest clusters per p
+    :param method: 'fire' clusters burnt trees (Neumann's neighbours) after the fire, 'newman_ziff' gets
+    the biggest cluster of all trees (regular neighbours) for every p from N occupation sweeps; it is a different
+    quantity, not an estimate of the 'fire' curve
+    :param processes: number of processes running the simulations, None uses all cores
+    :param seed: seed of the random streams of the simulations
+    :return: list of p, list of biggest clusters per p
     """
+    if method == 'newman_ziff':
+        p_list, _, sizes_per_p = newman_ziff(size=size, edge=edge, N=N, processes=processes, seed=seed)
+        return p_list, sizes_per_p
     p_list = np.linspace(0, 1, 100)
-    sizes_per_p = []
-    for p in p_list:
-        sizes_for_one_p = []
-        for n in range(N):
-            _, clusters = simulate(size=size, p=p, edge=edge, clusters=True)
-            num_per_cluster = Counter(clusters).values()
-            if num_per_cluster:
-                sizes_for_one_p.append(max(num_per_cluster))
-            else:
-                sizes_for_one_p.append(0)
-
-        sizes_per_p.append(sum(sizes_for_one_p)/N)
+    result = run_sweep(partial(_biggest_cluster_run, size=size, edge=edge), p_list, repetitions=N,
+                       processes=processes, seed=seed)
+    sizes_per_p = [float(mean) for mean in result.mean]
 
     return p_list, sizes_per_p
 
 
-def plot_cluster_size_vs_p(size=20, edge='left', N=100):
+def plot_cluster_size_vs_p(size=20, edge='left', N=100, method='fire'):
     """
     Plots cluster size vs p
     :param size: size of the squared lattice
     :param edge: edge of lattice where the fire starts
     :param N: number of monte carlo iterations
+    :param method: 'fire' or 'newman_ziff', see biggest_cluster_vs_p_MC
     """
-    p_list, size_per_p = biggest_cluster_vs_p_MC(size=size, edge=edge, N=N)
+    p_list, size_per_p = biggest_cluster_vs_p_MC(size=size, edge=edge, N=N, method=method)
     plt.plot(p_list, size_per_p)
-    plt.title('p vs size of the biggest cluster')
+    if method == 'newman_ziff':
+        plt.title('p vs size of the biggest cluster of trees')
+    else:
+        plt.title('p vs size of the biggest cluster of burnt trees')
     plt.xlabel('p')
     plt.ylabel('size')
     plt.show()
 
 
-def _generate_start_state_of_trees(size, p, gif=False):
+def _generate_start_state_of_trees(size, p, sink=None, rng=None):
     """
     Generates starting state of trees on the lattice.
     :param size: size of the square lattice
     :type size: int
     :param p: probability that a cell of the lattice is populated by a tree
     :param p: float
+    :param sink: frame sink to which the starting state is appended
+    :type sink: FrameSink or None
+    :param rng: random generator or seed
+    :type rng: numpy Generator, int or None
     """
     lattice = Lattice()
     lattice._configure(size=size)
 
-    for (x, y), value in np.ndenumerate(lattice.grid):
-        if random.random() < p:
-            lattice.grid[x, y] = 1
-    if gif:
-        plot_fire(lattice.grid, '0')
+    rng = np.random.default_rng(rng)
+    lattice.grid[rng.random([size, size]) < p] = 1
+    if sink:
+        sink.append(lattice.grid)
 
     return lattice
 
 
-def _del_remained_pngs():
-    path = os.getcwd()
-    for file in os.listdir(path):
-        if file.endswith('.png'):
-            os.remove(file)
+def _burn_run(p, rng, size, edge, N):
+    """
+    One task of the sequential monte carlo: N fires simulated at once for one p.
+    :return: boolean array, True for fires which got to the opposite edge
+    """
+    lattice = BatchLattice()
+    lattice.generate(size, p, N, rng=rng)
+    lattice.start_fire(edge=edge)
+    lattice.burn()
+    return lattice.reached_opposite_edge(edge=edge)
+
+
+def _burn_probability_run(p, rng, size, edge, N):
+    """
+    One task of the monte carlo sweep: N fires simulated at once for one p.
+    """
+    return burn_probability(size=size, p=p, edge=edge, N=N, rng=rng)
 
 
-def _sort_names(name):
-    return int(''.join(filter(str.isdigit, name)))
+def _fire_run(p, rng, size, edge, method):
+    """
+    One task of the monte carlo sweep: single fire ('fire') or percolation check ('percolation') for one p.
+    """
+    if method == 'percolation':
+        return check_percolation(size=size, p=p, edge=edge, rng=rng)
+    return simulate(size=size, p=p, edge=edge, rng=rng)
 
 
-def _sort_pngs():
-    imgs = glob.glob("*.png")
-    imgs.sort(key=_sort_names)
-    return imgs
+def _biggest_cluster_run(p, rng, size, edge):
+    """
+    One task of the monte carlo sweep: size of the biggest cluster of burnt trees after one fire.
+    """
+    _, cluster_sizes = simulate(size=size, p=p, edge=edge, clusters=True, rng=rng)
+    return cluster_sizes.max() if len(cluster_sizes) else 0
 
 
 def _get_p_threshold(p_list):
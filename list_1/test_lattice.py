@@ -0,0 +1,149 @@
+import numpy as np
+from pytest import fixture, mark
+from trees import Tree
+from lattice import Lattice, BatchLattice
+from union_find import UnionFind
+
+
+def _lattice(size, p, seed):
+    lattice = Lattice()
+    lattice._configure(size=size)
+    lattice.grid[np.random.default_rng(seed).random([size, size]) < p] = 1
+    return lattice
+
+
+def reference_change_state(grid):
+    trees, burning = np.argwhere(grid == 1).tolist(), np.argwhere(grid == 2)
+    for cord in burning:
+        grid[cord[0], cord[1]] = 3
+        tree = Tree()
+        tree._configure(place=cord)
+        for neighbour in tree._get_regular_neighbours():
+            if neighbour in trees:
+                grid[neighbour[0], neighbour[1]] = 2
+    return burning
+
+
+@fixture
+def lattice():
+    return _lattice(size=5, p=0, seed=0)
+
+
+def test_change_state_spreads_to_regular_neighbours(lattice):
+    lattice.grid[:, :] = 1
+    lattice.grid[2, 2] = 2
+    burning = lattice.change_state()
+    expected = np.ones([5, 5])
+    expected[1:4, 1:4] = 2
+    expected[2, 2] = 3
+    np.testing.assert_array_equal(burning, [[2, 2]])
+    np.testing.assert_array_equal(lattice.grid, expected)
+
+
+@mark.parametrize("edge", ['left', 'right', 'top', 'bottom'])
+@mark.parametrize("p, seed", [(0.4, 0), (0.6, 1), (0.8, 2)])
+def test_change_state_matches_reference(edge, p, seed):
+    lattice = _lattice(size=15, p=p, seed=seed)
+    lattice.start_fire(edge=edge)
+    reference = lattice.grid.copy()
+    burning = lattice.change_state()
+    while len(burning):
+        np.testing.assert_array_equal(burning, reference_change_state(reference))
+        np.testing.assert_array_equal(lattice.grid, reference)
+        burning = lattice.change_state()
+
+
+@mark.parametrize("edge", ['left', 'right', 'top', 'bottom'])
+@mark.parametrize("p, seed", [(0, 0), (0.3, 1), (0.59, 2), (0.7, 3), (1, 4)])
+def test_solve_fire_matches_change_state(edge, p, seed):
+    stepped, solved = _lattice(size=30, p=p, seed=seed), _lattice(size=30, p=p, seed=seed)
+    for lattice in (stepped, solved):
+        lattice.start_fire(edge=edge)
+    ignition_time = np.where(stepped.grid == 2, 0, -1)
+    step = 0
+    while len(stepped.change_state()):
+        step += 1
+        ignition_time[stepped.grid == 2] = step
+
+    burnt, time, reached = solved.solve_fire(edge=edge)
+    np.testing.assert_array_equal(solved.grid, stepped.grid)
+    np.testing.assert_array_equal(burnt, stepped.grid == 3)
+    np.testing.assert_array_equal(time, ignition_time)
+    assert reached == stepped.check_if_burnt(edge_cord=stepped.get_opposite_edge(edge))
+
+
+def reference_clusters(mask, connectivity):
+    n_rows, n_columns = mask.shape
+    if connectivity == 4:
+        offsets = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+    else:
+        offsets = [(a, b) for a in (-1, 0, 1) for b in (-1, 0, 1) if (a, b) != (0, 0)]
+    labels, sizes = np.zeros(mask.shape, dtype=int), []
+    for start in map(tuple, np.argwhere(mask)):
+        if labels[start]:
+            continue
+        sizes.append(0)
+        labels[start], stack = len(sizes), [start]
+        while stack:
+            x, y = stack.pop()
+            sizes[-1] += 1
+            for a, b in offsets:
+                n = (x + a, y + b)
+                if 0 <= n[0] < n_rows and 0 <= n[1] < n_columns and mask[n] and not labels[n]:
+                    labels[n] = len(sizes)
+                    stack.append(n)
+    return labels, sizes
+
+
+def test_union_find():
+    clusters = UnionFind(6)
+    clusters.union(0, 1)
+    clusters.union(2, 3)
+    clusters.union(1, 3)
+    assert clusters.find(0) == clusters.find(2)
+    assert clusters.find(4) != clusters.find(0)
+    assert clusters.size[clusters.find(3)] == 4
+
+
+@mark.parametrize("connectivity", [4, 8])
+@mark.parametrize("p, seed", [(0, 0), (0.4, 1), (0.6, 2), (1, 3)])
+def test_hoshen_kopelman_matches_flood_fill(connectivity, p, seed):
+    lattice = _lattice(size=25, p=p, seed=seed)
+    labels, sizes, histogram = lattice.hoshen_kopelman(state=1, connectivity=connectivity)
+    expected_labels, expected_sizes = reference_clusters(lattice.grid == 1, connectivity)
+    assert sorted(sizes) == sorted(expected_sizes)
+    np.testing.assert_array_equal(histogram, np.bincount(expected_sizes, minlength=len(histogram)))
+    assert (labels > 0).sum() == (lattice.grid == 1).sum()
+    for label in range(1, len(sizes) + 1):
+        cluster = labels == label
+        assert cluster.sum() == sizes[label - 1]
+        assert len(np.unique(expected_labels[cluster])) == 1
+
+
+@mark.parametrize("early_exit", [True, False])
+@mark.parametrize("edge", ['left', 'right', 'top', 'bottom'])
+def test_percolates_matches_fire(edge, early_exit):
+    for seed, p in enumerate(np.linspace(0.3, 0.8, 20)):
+        fire, percolation = _lattice(size=20, p=p, seed=seed), _lattice(size=20, p=p, seed=seed)
+        fire.start_fire(edge=edge)
+        _, _, reached = fire.solve_fire(edge=edge)
+        assert percolation.percolates(edge=edge, early_exit=early_exit) == reached
+
+
+@mark.parametrize("edge", ['left', 'right', 'top', 'bottom'])
+def test_batch_lattice_matches_single_lattices(edge):
+    batch = BatchLattice()
+    batch.generate(size=15, p=0.6, replicas=40)
+    single = []
+    for replica in batch.grid:
+        lattice = Lattice()
+        lattice.grid = replica.astype(float)
+        lattice.start_fire(edge=edge)
+        lattice.solve_fire()
+        single.append(lattice)
+    batch.start_fire(edge=edge)
+    batch.burn()
+    for replica, lattice in zip(batch.grid, single):
+        np.testing.assert_array_equal(replica, lattice.grid)
+    np.testing.assert_array_equal(batch.reached_opposite_edge(edge=edge),
+                                  [lattice.check_if_burnt(lattice.get_opposite_edge(edge)) for lattice in single])
@@ -0,0 +1,32 @@
+import numpy as np
+from pytest import mark
+from lattice import Lattice
+from newman_ziff import occupation_sweep, newman_ziff, _binomial_weights
+
+
+@mark.parametrize("edge", ['left', 'top'])
+def test_occupation_sweep_matches_lattice_clusters(edge, size=12):
+    order = np.random.default_rng(0).permutation(size * size)
+    spanning, biggest = occupation_sweep(size, edge, order=order)
+    assert not spanning[0] and biggest[0] == 0
+    for n in range(1, size * size + 1, 7):
+        lattice = Lattice()
+        lattice._configure(size=size)
+        lattice.grid.reshape(-1)[order[:n]] = 1
+        _, sizes, _ = lattice.hoshen_kopelman(state=1, connectivity=8)
+        assert biggest[n] == sizes.max()
+        assert spanning[n] == lattice.percolates(edge=edge)
+
+
+def test_binomial_weights_sum_to_one():
+    weights = _binomial_weights(400, np.linspace(0, 1, 11))
+    np.testing.assert_allclose(weights.sum(axis=1), 1)
+    assert weights[0, 0] == 1 and weights[-1, -1] == 1
+
+
+def test_newman_ziff_curve():
+    p_list, spanning, biggest = newman_ziff(size=10, N=5)
+    assert len(p_list) == len(spanning) == len(biggest) == 100
+    assert spanning[0] == 0 and spanning[-1] == 1
+    assert biggest[0] == 0 and biggest[-1] == 100
+    assert np.all(np.diff(spanning) >= -1e-12)
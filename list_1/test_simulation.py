@@ -1,6 +1,6 @@
 import numpy as np
-from unittest.mock import Mock, patch, call
-from pytest import mark
+from unittest.mock import ANY, Mock, patch, call
+from pytest import mark, raises
 from abmocn.list_1.simulation import _generate_start_state_of_trees, simulate, simulate_monte_carlo
 
 
@@ -13,42 +13,55 @@ def test_simulate():
     lattice_mock.check_if_burnt = Mock(return_value=expected)
     start_mock = Mock(return_value=lattice_mock)
     with patch("abmocn.list_1.simulation._generate_start_state_of_trees", start_mock):
-        result = simulate(size=20, p=0.5)
+        result = simulate(size=20, p=0.5, solver='steps')
 
-    start_mock.assert_called_once_with(20, 0.5, False)
+    start_mock.assert_called_once_with(20, 0.5, None, None)
     lattice_mock.get_opposite_edge.assert_called_once_with(edge='left')
     lattice_mock.start_fire.assert_called_once_with(edge='left')
     lattice_mock.change_state.assert_has_calls([call(), call(), call()])
     assert result == expected
 
 
+def test_simulate_with_bfs_solver():
+    lattice_mock = Mock()
+    lattice_mock.solve_fire = Mock(return_value=(Mock(), Mock(), True))
+    start_mock = Mock(return_value=lattice_mock)
+    with patch("abmocn.list_1.simulation._generate_start_state_of_trees", start_mock):
+        result = simulate(size=20, p=0.5)
+
+    start_mock.assert_called_once_with(20, 0.5, None, None)
+    lattice_mock.start_fire.assert_called_once_with(edge='left')
+    lattice_mock.solve_fire.assert_called_once_with(edge='left')
+    lattice_mock.change_state.assert_not_called()
+    assert result is True
+
+
 def test_simulate_with_gif_and_clusters():
     lattice_mock = Mock()
     lattice_mock.get_opposite_edge = Mock(return_value=['opposite cords'])
     lattice_mock.change_state = Mock(side_effect=[['burnt tree'], ['burnt tree'], []])
     lattice_mock.start_fire = Mock()
-    tree_instance = Mock()
-    tree_instance.cluster_type = Mock()
-    lattice_mock.hoshen_kopelman = Mock(return_value=[tree_instance])
+    cluster_sizes = np.array([3, 1])
+    lattice_mock.hoshen_kopelman = Mock(return_value=(Mock(), cluster_sizes, Mock()))
     expected = True
     lattice_mock.check_if_burnt = Mock(return_value=expected)
     start_mock = Mock(return_value=lattice_mock)
-    del_mock, plot_mock = Mock(), Mock()
+    sink_mock = Mock()
     with patch("abmocn.list_1.simulation._generate_start_state_of_trees", start_mock), \
-         patch("abmocn.list_1.simulation._del_remained_pngs", del_mock), \
-         patch("abmocn.list_1.simulation.plot_fire", plot_mock):
+         patch("abmocn.list_1.simulation.GifWriter", Mock()), \
+         patch("abmocn.list_1.simulation.AsyncSink", Mock(return_value=sink_mock)):
         result, cluster = simulate(size=20, p=0.5, gif=True, clusters=True)
 
-    start_mock.assert_called_once_with(20, 0.5, True)
+    start_mock.assert_called_once_with(20, 0.5, sink_mock, None)
     lattice_mock.get_opposite_edge.assert_called_once_with(edge='left')
     lattice_mock.start_fire.assert_called_once_with(edge='left')
     lattice_mock.change_state.assert_has_calls([call(), call(), call()])
-    del_mock.assert_called_once()
-    plot_mock.assert_has_calls([call(lattice_mock.grid, '1'), call(lattice_mock.grid, '2'),
-                                call(lattice_mock.grid, '3')])
+    sink_mock.append.assert_has_calls([call(lattice_mock.grid)] * 3)
+    sink_mock.close.assert_called_once()
     lattice_mock.hoshen_kopelman.assert_called_once()
 
     assert result == expected
+    assert cluster is cluster_sizes
 
 
 @mark.parametrize("p, N", [([0.5], 2), ([0.25, 0.75], 2)])
@@ -57,9 +70,9 @@ def test_simulate_monte_carlo(p, N):
     p_range = Mock(return_value=p)
     with patch('abmocn.list_1.simulation.simulate', simulate_mock), \
          patch('abmocn.list_1.simulation.np.linspace', p_range):
-        simulate_monte_carlo(N=N)
+        simulate_monte_carlo(N=N, method='fire')
 
-    calls = [call(size=20, p=value, edge='left') for value in p]
+    calls = [call(size=20, p=value, edge='left', rng=ANY) for value in p]
     simulate_mock.assert_has_calls(calls)
 
 
@@ -78,9 +91,27 @@ def test__generate_start_state_of_trees_with_gif(size=5):
     lattice_instance_mock._configure = Mock()
     lattice_instance_mock.grid = np.zeros(shape=[size, size])
     lattice_mock = Mock(return_value=lattice_instance_mock)
-    gif_mock = Mock()
-    with patch("abmocn.list_1.simulation.Lattice", lattice_mock), \
-         patch("abmocn.list_1.simulation.plot_fire", gif_mock):
-        _generate_start_state_of_trees(size, p=0.5, gif=True)
+    sink_mock = Mock()
+    with patch("abmocn.list_1.simulation.Lattice", lattice_mock):
+        _generate_start_state_of_trees(size, p=0.5, sink=sink_mock)
     lattice_instance_mock._configure.assert_called_once_with(size=size)
-    gif_mock.assert_called_once_with(lattice_instance_mock.grid, '0')
+    sink_mock.append.assert_called_once_with(lattice_instance_mock.grid)
+
+
+def test_seeded_runs_are_reproducible():
+    first = _generate_start_state_of_trees(10, p=0.5, rng=3).grid
+    np.testing.assert_array_equal(first, _generate_start_state_of_trees(10, p=0.5, rng=3).grid)
+    _, burnt_per_p = simulate_monte_carlo(size=8, N=5, method='fire', seed=1)
+    assert burnt_per_p == simulate_monte_carlo(size=8, N=5, method='fire', seed=1)[1]
+
+
+def test_simulate_monte_carlo_until_tolerance():
+    p_list, burnt_per_p, errors = simulate_monte_carlo(size=8, N=20, tol=0.05, seed=0)
+    assert len(p_list) == len(burnt_per_p) == len(errors) == 100
+    assert burnt_per_p[0] == 0 and burnt_per_p[-1] == 1
+    assert max(errors) <= 0.05
+
+
+def test_simulate_monte_carlo_adaptive_runs_in_one_process():
+    with raises(ValueError):
+        simulate_monte_carlo(size=8, N=5, method='adaptive', processes=2)
@@ -0,0 +1,31 @@
+import numpy as np
+from threshold import estimate_p_threshold, _get_probabilities, _get_crossing
+
+
+def test_probabilities_are_pooled_to_be_non_decreasing():
+    p_list = [0.1, 0.2, 0.3, 0.4]
+    burnt, fires = dict(zip(p_list, [10, 60, 40, 90])), dict.fromkeys(p_list, 100)
+    q, se = _get_probabilities(p_list, burnt, fires)
+    np.testing.assert_allclose(q, [0.1, 0.5, 0.5, 0.9])
+    assert se[1] == se[2] < se[0] * 2
+
+
+def test_crossing_and_its_interval():
+    p_list = np.array([0.0, 0.4, 0.5, 0.6, 1.0])
+    q = np.array([0.0, 0.3, 0.45, 0.7, 1.0])
+    p_threshold, lower, upper = _get_crossing(p_list, q, np.full(5, 0.01))
+    assert p_threshold == np.interp(0.5, q, p_list)
+    assert (lower, upper) == (2, 3)
+
+
+def test_estimate_p_threshold_reaches_tolerance():
+    p_list, q, p_threshold, half_width = estimate_p_threshold(size=15, tol=0.01, rng=0)
+    assert half_width < 0.01
+    assert p_list == sorted(p_list) and len(p_list) == len(q)
+    assert 0.35 < p_threshold < 0.5
+    assert np.diff(p_list).min() < 0.1 / 4
+
+
+def test_estimate_p_threshold_stops_at_budget():
+    *_, half_width = estimate_p_threshold(size=15, tol=1e-6, budget=3000, rng=0)
+    assert half_width > 1e-6
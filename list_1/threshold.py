@@ -0,0 +1,87 @@
+import numpy as np
+from lattice import BatchLattice
+
+
+def estimate_p_threshold(size=20, edge='left', N=100, tol=0.01, n_start=11, n_split=2, budget=10 ** 6, rng=None):
+    """
+    Estimates the percolation threshold p_c, where the probability of the fire getting to the opposite edge is 1/2,
+    on an adaptive grid of p. It starts from a coarse grid and in every round adds N fires to every point inside
+    the confidence interval of p_c and splits the n_split intervals inside it with the biggest change of
+    the probability (or its uncertainty), until the half-width of the interval is below tol or budget fires
+    were simulated.
+    :param size: size of the squared lattice
+    :param edge: edge of lattice where the fire starts
+    :param N: number of fires simulated at once for one p
+    :param tol: target half-width of the confidence interval of p_c
+    :param n_start: number of points of the starting grid
+    :param n_split: number of intervals split in every round
+    :param budget: maximum number of simulated fires
+    :param rng: random generator or seed
+    :return: list of p, list of probabilities of the fire getting to the opposite edge, p_c, half-width
+    of its confidence interval
+    """
+    rng = np.random.default_rng(rng)
+    burnt, fires = {}, {}
+    for p in np.linspace(0, 1, n_start):
+        _add_fires(burnt, fires, p, size, edge, N, rng)
+    while True:
+        p_list = np.array(sorted(fires))
+        q, se = _get_probabilities(p_list, burnt, fires)
+        p_threshold, lower, upper = _get_crossing(p_list, q, se)
+        half_width = (p_list[upper] - p_list[lower]) / 2
+        inside = range(lower, upper + 1)
+        if half_width < tol or sum(fires.values()) + (len(inside) + n_split) * N > budget:
+            return list(p_list), list(q), p_threshold, half_width
+        score = np.abs(np.diff(q[lower:upper + 1])) + 1.96 * (se[lower:upper] + se[lower + 1:upper + 1])
+        for i in np.argsort(score)[::-1][:n_split] + lower:
+            _add_fires(burnt, fires, (p_list[i] + p_list[i + 1]) / 2, size, edge, N, rng)
+        for i in inside:
+            _add_fires(burnt, fires, p_list[i], size, edge, N, rng)
+
+
+def _add_fires(burnt, fires, p, size, edge, N, rng):
+    """
+    Simulates N fires for one p and adds them to the counters.
+    :param burnt: number of fires which got to the opposite edge per p
+    :param fires: number of fires per p
+    """
+    lattice = BatchLattice()
+    lattice.generate(size, p, N, rng=rng)
+    lattice.start_fire(edge=edge)
+    lattice.burn()
+    burnt[p] = burnt.get(p, 0) + int(lattice.reached_opposite_edge(edge=edge).sum())
+    fires[p] = fires.get(p, 0) + N
+
+
+def _get_probabilities(p_list, burnt, fires):
+    """
+    Gets probabilities of the fire getting to the opposite edge, made non-decreasing in p by pooling
+    adjacent points which violate the order, and their standard errors.
+    :return: array of probabilities, array of standard errors
+    """
+    blocks = []
+    for p in p_list:
+        blocks.append([burnt[p], fires[p], 1])
+        while len(blocks) > 1 and blocks[-2][0] * blocks[-1][1] > blocks[-1][0] * blocks[-2][1]:
+            b, n, m = blocks.pop()
+            blocks[-1] = [blocks[-1][0] + b, blocks[-1][1] + n, blocks[-1][2] + m]
+    q = np.repeat([b / n for b, n, _ in blocks], [m for _, _, m in blocks])
+    n = np.repeat([n for _, n, _ in blocks], [m for _, _, m in blocks])
+    return q, np.sqrt(np.maximum(q * (1 - q), 1 / n) / n)
+
+
+def _get_crossing(p_list, q, se):
+    """
+    Finds p where the probability crosses 1/2 by linear interpolation, together with the confidence interval
+    of the crossing: between the last point whose 95% interval of the probability is below 1/2 and the first
+    one whose interval is above it.
+    :return: p_c, index of the lower and of the upper end of its confidence interval
+    """
+    below = np.flatnonzero(q + 1.96 * se < 0.5)
+    above = np.flatnonzero(q - 1.96 * se > 0.5)
+    lower = below[-1] if len(below) else 0
+    upper = above[0] if len(above) else len(q) - 1
+    k = min(max(int(np.searchsorted(q, 0.5)), 1), len(q) - 1)
+    dq = q[k] - q[k - 1]
+    t = (0.5 - q[k - 1]) / dq if dq > 0 else 0.5
+    return p_list[k - 1] + t * (p_list[k] - p_list[k - 1]), lower, upper
@@ -0,0 +1,43 @@
+class UnionFind:
+    """
+    Disjoint sets of elements 0..n-1 kept in parent and size arrays, with path compression and union by size.
+    """
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, a):
+        """
+        Finds root of the set containing a, compressing the path on the way.
+        :param a: element
+        :type a: int
+        :return: root of the set
+        :rtype: int
+        """
+        parent = self.parent
+        root = a
+        while parent[root] != root:
+            root = parent[root]
+        while parent[a] != root:
+            parent[a], a = root, parent[a]
+        return root
+
+    def union(self, a, b):
+        """
+        Merges sets containing a and b, attaching the smaller one to the larger one.
+        :param a: element
+        :type a: int
+        :param b: element
+        :type b: int
+        :return: root of the merged set
+        :rtype: int
+        """
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
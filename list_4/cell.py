@@ -1,10 +1,23 @@
 #Authors: Karolina Ostrowska, Aleksandra Sawczuk
+from functools import lru_cache
 from itertools import product, starmap
 import numpy as np
 
 
 class cell:
-    def __init__(self):
+    """
+    Cell of the lattice, keeping its own occupant (1 red, 2 blue, 3 empty) or, when grid is given,
+    a view of one element of an array of occupants.
+    :param grid: array of occupants
+    :type grid: numpy array or None
+    :param index: index of the element of grid
+    :type index: tuple or None
+    """
+    __slots__ = ('_grid', '_index', '_occupant')
+
+    def __init__(self, grid=None, index=None):
+        self._grid = grid
+        self._index = index
         self._occupant = 3
 
     @property
@@ -14,7 +27,9 @@ class cell:
         :return: occupant attribute value
         :rtype: int
         """
-        return self._occupant
+        if self._grid is None:
+            return self._occupant
+        return int(self._grid[self._index])
 
     @occupant.setter
     def occupant(self, occupant):
@@ -23,20 +38,24 @@ class cell:
         :param occupant: occupant attribute value that will be set
         :type occupant: int
         """
-        self._occupant = occupant
+        if self._grid is None:
+            self._occupant = occupant
+        else:
+            self._grid[self._index] = occupant
 
-    def get_neighbours(self, a, b, size=[100, 100]):
+    def get_neighbours(self, a, b, size=None):
         """
         Gets neighbours of cell.
         :param a: first coordinate of element
         :type a: int
         :param b: second coordinate of element
         :type b: int
-        :param size: size of array
-        :type size: list of int
+        :param size: size of array, by default shape of the viewed grid or [100, 100]
+        :type size: list of int or None
         :return: list of neighbours
         :rtype: list of lists
         """
+        size = self._get_size(size)
         neighs = self._get_all_neighbours(a, b)
         n_list = []
         for n in neighs:
@@ -44,7 +63,7 @@ class cell:
                 n_list.append(n)
         return n_list
 
-    def get_periodic_neighbours(self, a, b, layer=1, size=[100, 100]):
+    def get_periodic_neighbours(self, a, b, layer=1, size=None):
         """
         Gets periodic neighbours on array of element.
         :param a: first coordinate of element
@@ -53,30 +72,21 @@ class cell:
         :type b: int
         :param layer: layer of neighbours
         :type layer: int
-        :param size: size of array
-        :type size: list of int
+        :param size: size of array, by default shape of the viewed grid or [100, 100]
+        :type size: list of int or None
         :return: list of neighbours
         :rtype: list of tuples
         """
-        neighs = self.get_layered_neighbours(a, b, layer)
-        n_list = []
-        for n in neighs:
-            n_cords = []
-            if 0 <= n[0] < size[0]:
-                n_cords.append(n[0])
-            if n[0] < 0:
-                n_cords.append(size[0] + n[0])
-            if n[0] >= size[0]:
-                n_cords.append(abs(size[0] - n[0]))
-            if 0 <= n[1] < size[1]:
-                n_cords.append(n[1])
-            if n[1] >= size[1]:
-                n_cords.append(abs(size[1] - n[1]))
-            if n[1] < 0:
-                n_cords.append(size[1] + n[1])
-            n_list.append(tuple(n_cords))
+        n_rows, n_columns = self._get_size(size)
+        return [(x % n_rows, y % n_columns) for x, y in self.get_layered_neighbours(a, b, layer)]
 
-        return n_list
+    def _get_size(self, size):
+        """
+        Gets size of array used for neighbours.
+        """
+        if size is not None:
+            return size
+        return [100, 100] if self._grid is None else list(self._grid.shape)
 
     @staticmethod
     def get_layered_neighbours(x, y, layer):
@@ -107,3 +117,24 @@ class cell:
         """
         cells = starmap(lambda a, b: (x + a, y + b), product((0, -1, +1), (0, -1, +1)))
         return [i for i in cells if i != (x, y)]
+
+
+@lru_cache(maxsize=8)
+def neighbour_table(shape, layer):
+    """
+    Gets flat indices of periodic neighbours of every cell of a grid, in the order of cell.get_layered_neighbours.
+    Tables of the last 8 pairs of shape and layer are cached, so they are reused between iterations and runs.
+    :param shape: number of rows and columns
+    :type shape: tuple of int
+    :param layer: layer of neighbours
+    :type layer: int
+    :return: read-only int32 array of shape (rows * columns, (2 * layer + 1)^2 - 1), row of a cell is its flat index
+    :rtype: numpy array
+    """
+    n_rows, n_columns = shape
+    row_offsets, column_offsets = np.array([n for n in product(range(-layer, layer + 1), repeat=2) if n != (0, 0)]).T
+    rows, columns = np.divmod(np.arange(n_rows * n_columns), n_columns)
+    table = ((rows[:, None] + row_offsets) % n_rows * n_columns
+             + (columns[:, None] + column_offsets) % n_columns).astype(np.int32)
+    table.flags.writeable = False
+    return table
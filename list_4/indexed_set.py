@@ -0,0 +1,55 @@
+class IndexedSet:
+    """
+    Set of hashable items kept in a list together with a map from item to its position in the list,
+    so adding, removing (by swapping with the last item) and drawing a random item take O(1).
+    :param items: starting items
+    :type items: iterable
+    """
+
+    def __init__(self, items=()):
+        self._items = []
+        self._positions = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._positions
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, position):
+        return self._items[position]
+
+    def add(self, item):
+        """
+        Adds item, if it is not in the set yet.
+        :param item: hashable item
+        """
+        if item not in self._positions:
+            self._positions[item] = len(self._items)
+            self._items.append(item)
+
+    def remove(self, item):
+        """
+        Removes item from the set.
+        :param item: item in the set
+        :raises KeyError: if item is not in the set
+        """
+        position = self._positions.pop(item)
+        last = self._items.pop()
+        if position < len(self._items):
+            self._items[position] = last
+            self._positions[last] = position
+
+    def choice(self, rng):
+        """
+        Draws random item.
+        :param rng: random generator
+        :type rng: numpy Generator
+        :return: item
+        """
+        return self._items[rng.integers(len(self._items))]
@@ -1,12 +1,21 @@
 import numpy as np
-import random
-from collections import Counter
+from indexed_set import IndexedSet
+from cell import cell, neighbour_table
 
 
 class Lattice:
+    """
+    Lattice of agents.
+    :param rng: random generator or seed used for placing and moving agents
+    :type rng: numpy Generator, int or None
+    """
 
-    def __init__(self):
+    def __init__(self, rng=None):
         self._grid = None
+        self._free = None
+        self._hash = None
+        self.n_moved = None
+        self.rng = np.random.default_rng(rng)
 
     @property
     def grid(self):
@@ -24,6 +33,20 @@ class Lattice:
         :param val: value that will be assigned to grid attribute
         """
         self._grid = val
+        self._free = None
+        self._hash = None
+
+    @property
+    def board_hash(self):
+        """
+        Hash of the board: xor of splitmix64 keys of (cell, occupant) pairs. It is computed from the whole grid
+        on the first use and from then on updated by every iteration only at the changed places.
+        :return: hash of occupants of the grid
+        :rtype: int
+        """
+        if self._hash is None:
+            self._hash = _get_hash(np.arange(self.grid.size), self._get_occupants())
+        return int(self._hash)
 
     def start_simulation(self, n_red=250, n_blue=250):
         """
@@ -33,19 +56,12 @@ class Lattice:
         :param n_blue: number of blue agents
         :type n_blue: int
         """
-        n_of_ragents, n_of_bagents = 0, 0
-        stop = False
-        while not stop:
-            x_r, y_r = random.choice(self._get_empty_spaces())
-            x_b, y_b = random.choice(self._get_empty_spaces())
-            if self.grid[x_r, y_r].occupant == 3 and n_of_ragents < n_red:
-                self.grid[x_r, y_r].occupant = 1
-                n_of_ragents += 1
-            if self.grid[x_b, y_b].occupant == 3 and n_of_bagents < n_blue:
-                self.grid[x_b, y_b].occupant = 2
-                n_of_bagents += 1
-
-            stop = all([n_of_ragents == n_red, n_of_bagents == n_blue])
+        self._hash = None
+        free = self._get_free()
+        for n in range(n_red + n_blue):
+            place = free.choice(self.rng)
+            free.remove(place)
+            self.grid[place].occupant = 1 if n < n_red else 2
 
     def change_state(self, ratio_r=0.5, ratio_b=0.5, neigh_layer=1):
         """
@@ -60,11 +76,12 @@ class Lattice:
         :rtype: int or float
         """
         grid = np.copy(self.grid)
+        neighbours = self._get_occupants()[neighbour_table(grid.shape, neigh_layer)]
+        counts = [np.count_nonzero(neighbours == occupant, axis=1).tolist() for occupant in (1, 2, 3)]
         segregation = []
         unhappy_list = []
-        for index, elem in np.ndenumerate(grid):
-            neighs = elem.get_periodic_neighbours(index[0], index[1], neigh_layer, list(grid.shape))
-            n_statuses = Counter([grid[n].occupant for n in neighs])
+        for n, (index, elem) in enumerate(np.ndenumerate(grid)):
+            n_statuses = {occupant: counts[occupant - 1][n] for occupant in (1, 2, 3)}
             ratio = self._get_ratio(elem, ratio_r, ratio_b)
             other = self._get_oppsite_occupant(elem)
             current_ratio = self._get_current_ratio(elem, other, n_statuses)
@@ -72,21 +89,27 @@ class Lattice:
             if 0 <= current_ratio < ratio:
                 unhappy_list.append([index, elem])
 
-        possible_locations = self._get_empty_spaces() + [place[0] for place in unhappy_list]
+        possible_locations = self._get_free()
+        for place in unhappy_list:
+            possible_locations.add(place[0])
+        locations = list(possible_locations)
+        places = np.ravel_multi_index(tuple(np.array(locations, dtype=int).reshape(-1, 2).T), self.grid.shape)
+        before = self._get_place_occupants(locations)
         self._shuffle_unhappy_agents(unhappy_list, possible_locations)
+        self._record_moves(places, before, self._get_place_occupants(locations))
         return sum(segregation)/len(segregation)
 
     def get_random_location(self, choice, exclude):
         """
         Gets random location from available locations with exclusion of "exclude".
-        :param choice: list of possible locations
-        :type choice: list of tuples
+        :param choice: possible locations
+        :type choice: IndexedSet or list of tuples
         :param exclude: element that should be excluded from draw
         :type exclude: tuple
         :return: random element chosen from "choice"
         :rtype: tuple
         """
-        place = random.choice(choice)
+        place = choice[self.rng.integers(len(choice))]
         return self.get_random_location(choice, exclude) if place in exclude else place
 
     def _shuffle_unhappy_agents(self, unhappy_list, possible_locations):
@@ -94,10 +117,10 @@ class Lattice:
         Shuffles unhappy angents on the grid.
         :param unhappy_list: list of unhappy agents
         :type unhappy_list: list of lists, [[location of agent, agent instance]]
-        :param possible_locations: list of possible locations on the grid
-        :type possible_locations: list of tuples
+        :param possible_locations: possible locations on the grid, places left after moves stay in it as empty
+        :type possible_locations: IndexedSet or list of tuples
         """
-        empty_instances = self._get_empty_spaces_instances()
+        empty_instances = [self.grid[place] for place in possible_locations if self.grid[place].occupant == 3]
         for unhappy_agent in unhappy_list:
             new_location = self.get_random_location(possible_locations, unhappy_agent[0])
             possible_locations.remove(new_location)
@@ -105,6 +128,41 @@ class Lattice:
         for left_place in range(len(possible_locations)):
             self.grid[possible_locations[left_place]] = empty_instances[left_place]
 
+    def _record_moves(self, places, before, after):
+        """
+        Counts agents which moved in the iteration and updates the board hash, if it is used. Agents of one colour
+        are not distinguished, so n_moved is the number of places taken by an agent which held a different
+        occupant before, and it is 0 only if the board did not change.
+        :param places: flat indices of all places which could change
+        :type places: numpy array
+        :param before: occupants of the places before the iteration
+        :type before: numpy array
+        :param after: occupants of the places after the iteration
+        :type after: numpy array
+        """
+        changed = before != after
+        self.n_moved = int(np.count_nonzero(changed & (after != 3)))
+        if self._hash is not None:
+            self._hash ^= _get_hash(places[changed], before[changed]) ^ _get_hash(places[changed], after[changed])
+
+    def _get_occupants(self):
+        """
+        Gets flat array of occupants of the grid.
+        :return: occupants
+        :rtype: numpy array
+        """
+        return np.array([elem.occupant for elem in self.grid.flat], dtype=np.int8)
+
+    def _get_place_occupants(self, places):
+        """
+        Gets occupants of chosen places of the grid.
+        :param places: indices of the places
+        :type places: list of tuples
+        :return: occupants
+        :rtype: numpy array
+        """
+        return np.array([self.grid[place].occupant for place in places], dtype=np.int8)
+
     @staticmethod
     def _get_current_ratio(elem, other, n_statuses):
         """
@@ -145,6 +203,16 @@ class Lattice:
         """
         return ratio_r if elem.occupant == 1 else ratio_b if elem.occupant == 2 else -1
 
+    def _get_free(self):
+        """
+        Gets set of empty spaces on grid, kept up to date by placing and moving agents.
+        :return: set of empty spaces
+        :rtype: IndexedSet
+        """
+        if self._free is None:
+            self._free = IndexedSet(self._get_empty_spaces())
+        return self._free
+
     def _get_empty_spaces(self):
         """
         Gets empty spaces on grid.
@@ -153,10 +221,313 @@ class Lattice:
         """
         return [index for index, loc in np.ndenumerate(self.grid) if loc.occupant == 3]
 
-    def _get_empty_spaces_instances(self):
+
+class ArrayLattice(Lattice):
+    """
+    Lattice of agents kept as an int8 array of occupants (1 red, 2 blue, 3 empty). Neighbour counts
+    for any layer are periodic box sums of colour masks, so one iteration is a few array operations.
+    Happiness and segregation index follow Lattice: for empty cells the ratio of empty to empty
+    and blue neighbours is counted in the index too.
+    :param rng: random generator or seed used for placing and moving agents
+    :type rng: numpy Generator, int or None
+    """
+
+    def get_cell(self, index):
+        """
+        Gets cell viewing one element of the grid.
+        :param index: index of the element
+        :type index: tuple
+        :return: cell reading and writing the occupant of the element
+        :rtype: cell
+        """
+        return cell(self.grid, index)
+
+    def start_simulation(self, n_red=250, n_blue=250):
+        """
+        Makes the starting state on grid. Blue and red agents are set in random places on the lattice.
+        :param n_red: number of red agents
+        :type n_red: int
+        :param n_blue: number of blue agents
+        :type n_blue: int
+        """
+        self._hash = None
+        flat = self.grid.reshape(-1)
+        empty = np.flatnonzero(flat == 3)
+        chosen = empty[self.rng.choice(len(empty), size=n_red + n_blue, replace=False)]
+        flat[chosen[:n_red]] = 1
+        flat[chosen[n_red:]] = 2
+
+    def change_state(self, ratio_r=0.5, ratio_b=0.5, neigh_layer=1):
+        """
+        Changes state on the grid in one iteration. Unhappy agents are moved to random places
+        drawn from empty cells and places of unhappy agents.
+        :param ratio_r: Ratio for happiness for red agents
+        :type ratio_r: float
+        :param ratio_b: Ratio for happiness for blue agents
+        :type ratio_b: float
+        :param neigh_layer: layer of neighbours that should be taken into account
+        :type neigh_layer: int
+        :return: segregation index for one iteration
+        :rtype: float
+        """
+        ratios, unhappy = self._get_happiness(ratio_r, ratio_b, neigh_layer)
+        flat = self.grid.reshape(-1)
+        movers = np.flatnonzero(unhappy)
+        locations = np.concatenate([np.flatnonzero(flat == 3), movers])
+        before = flat[locations]
+        flat[locations] = 3
+        flat[locations[self.rng.permutation(len(locations))[:len(movers)]]] = before[len(locations) - len(movers):]
+        self._record_moves(locations, before, flat[locations])
+        return float(ratios.mean())
+
+    def _get_occupants(self):
+        """
+        Gets flat array of occupants of the grid.
+        :return: occupants
+        :rtype: numpy array
+        """
+        return self.grid.reshape(-1)
+
+    def _get_happiness(self, ratio_r, ratio_b, neigh_layer):
+        """
+        Gets ratio of same-colour neighbours and unhappiness of every cell.
+        :param ratio_r: Ratio for happiness for red agents
+        :type ratio_r: float
+        :param ratio_b: Ratio for happiness for blue agents
+        :type ratio_b: float
+        :param neigh_layer: layer of neighbours
+        :type neigh_layer: int
+        :return: array of ratios, boolean array of unhappy agents
+        :rtype: tuple
+        """
+        grid = self.grid
+        counts = [self._get_box_sum(grid == occupant, neigh_layer) - (grid == occupant) for occupant in (1, 2, 3)]
+        return self._get_ratios(grid, *counts, ratio_r, ratio_b)
+
+    @staticmethod
+    def _get_ratios(occupants, red, blue, empty, ratio_r, ratio_b):
+        """
+        Gets ratio of same-colour neighbours and unhappiness of cells from their neighbour counts.
+        :param occupants: occupants of the cells
+        :type occupants: numpy array
+        :param red: number of red neighbours of the cells
+        :type red: numpy array
+        :param blue: number of blue neighbours of the cells
+        :type blue: numpy array
+        :param empty: number of empty neighbours of the cells
+        :type empty: numpy array
+        :param ratio_r: Ratio for happiness for red agents
+        :type ratio_r: float
+        :param ratio_b: Ratio for happiness for blue agents
+        :type ratio_b: float
+        :return: array of ratios, boolean array of unhappy agents
+        :rtype: tuple
+        """
+        own = np.where(occupants == 1, red, np.where(occupants == 2, blue, empty))
+        other = np.where(occupants == 2, red, blue)
+        colored = own + other
+        ratios = np.divide(own, colored, out=np.zeros(occupants.shape), where=colored != 0)
+        threshold = np.where(occupants == 1, ratio_r, np.where(occupants == 2, ratio_b, -1))
+        return ratios, (ratios >= 0) & (ratios < threshold)
+
+    @staticmethod
+    def _get_box_sum(mask, layer):
+        """
+        Sums mask over (2 * layer + 1) x (2 * layer + 1) periodic windows centred on every cell.
+        :param mask: boolean array
+        :type mask: numpy array
+        :param layer: layer of neighbours
+        :type layer: int
+        :return: array of sums
+        :rtype: numpy array
+        """
+        size = 2 * layer + 1
+        sums = np.zeros([mask.shape[0] + size, mask.shape[1] + size], dtype=np.int32)
+        sums[1:, 1:] = np.pad(mask, layer, mode='wrap').cumsum(axis=0).cumsum(axis=1)
+        return sums[size:, size:] - sums[:-size, size:] - sums[size:, :-size] + sums[:-size, :-size]
+
+
+class IncrementalLattice(ArrayLattice):
+    """
+    Array lattice which keeps numbers of red and blue agents in the window of every cell, ratios of all cells
+    with their running sum and sets of unhappy agents and empty cells. Only windows around places changed
+    by moves are updated, so an iteration costs proportionally to the number of moves.
+    Unlike Lattice, agents unhappy at the start of an iteration move one after another, in random order,
+    to random empty cells (including cells left earlier in the same iteration). When there is no empty cell,
+    an unhappy agent stays in place. While windows of unhappy agents cover more than move_all_fraction
+    of the grid, as in the first iterations, agents are moved all at once like in ArrayLattice and everything
+    is recounted.
+    :param rng: random generator or seed used for placing and moving agents
+    :type rng: numpy Generator, int or None
+    """
+    move_all_fraction = 0.25
+    _params = None
+
+    @ArrayLattice.grid.setter
+    def grid(self, val):
+        """
+        Grid attribute setter, counts are made again for the new grid.
+        :param val: value that will be assigned to grid attribute
         """
-        Gets instances of empty cells on grid.
-        :return: list of cell instances that represent empty places
-        :rtype: list of cell instances
+        Lattice.grid.fset(self, val)
+        self._params = None
+
+    def start_simulation(self, n_red=250, n_blue=250):
+        super().start_simulation(n_red=n_red, n_blue=n_blue)
+        self._params = None
+
+    def change_state(self, ratio_r=0.5, ratio_b=0.5, neigh_layer=1):
         """
-        return [loc for index, loc in np.ndenumerate(self.grid) if loc.occupant == 3]
+        Changes state on the grid in one iteration.
+        :param ratio_r: Ratio for happiness for red agents
+        :type ratio_r: float
+        :param ratio_b: Ratio for happiness for blue agents
+        :type ratio_b: float
+        :param neigh_layer: layer of neighbours that should be taken into account
+        :type neigh_layer: int
+        :return: segregation index for one iteration
+        :rtype: float
+        """
+        if self._params != (ratio_r, ratio_b, neigh_layer):
+            self._build(ratio_r, ratio_b, neigh_layer)
+        segregation = self._ratio_sum / self.grid.size
+        n_unhappy = np.count_nonzero(self._is_unhappy) if self._unhappy is None else len(self._unhappy)
+        if n_unhappy * len(self._row_offsets) > self.move_all_fraction * self.grid.size:
+            self._move_all()
+            return float(segregation)
+        if self._unhappy is None:
+            self._unhappy = IndexedSet(np.flatnonzero(self._is_unhappy).tolist())
+            self._free = IndexedSet(np.flatnonzero(self.grid.reshape(-1) == 3).tolist())
+        movers = np.array(list(self._unhappy), dtype=np.int64)[self.rng.permutation(len(self._unhappy))]
+        targets = np.empty_like(movers)
+        for k, source in enumerate(movers.tolist()):
+            if not self._free:
+                targets[k] = source
+                continue
+            targets[k] = self._free.choice(self.rng)
+            self._free.remove(int(targets[k]))
+            self._free.add(source)
+        self._move(movers, targets)
+        return float(segregation)
+
+    def _build(self, ratio_r, ratio_b, neigh_layer):
+        """
+        Counts agents in windows of all cells and finds unhappy agents.
+        """
+        self._params = (ratio_r, ratio_b, neigh_layer)
+        offsets = np.arange(-neigh_layer, neigh_layer + 1)
+        self._row_offsets, self._column_offsets = [a.reshape(-1) for a in np.meshgrid(offsets, offsets, indexing='ij')]
+        self._recount()
+
+    def _recount(self):
+        """
+        Counts agents in windows of all cells and gets ratios and unhappiness of all cells from scratch.
+        Sets of unhappy agents and empty cells are made again when they are needed.
+        """
+        self._count_windows()
+        self._ratios, self._is_unhappy = self._get_cell_ratios(np.arange(self.grid.size))
+        self._ratio_sum = self._ratios.sum()
+        self._unhappy, self._free = None, None
+
+    def _move_all(self):
+        """
+        Moves all unhappy agents at once to random places drawn from empty cells and places of unhappy agents,
+        like ArrayLattice.change_state, and recounts everything.
+        """
+        flat = self.grid.reshape(-1)
+        movers = np.flatnonzero(self._is_unhappy)
+        locations = np.concatenate([np.flatnonzero(flat == 3), movers])
+        before = flat[locations]
+        flat[locations] = 3
+        flat[locations[self.rng.permutation(len(locations))[:len(movers)]]] = before[len(locations) - len(movers):]
+        self._record_moves(locations, before, flat[locations])
+        self._recount()
+
+    def _count_windows(self):
+        """
+        Counts red and blue agents in windows of all cells from scratch.
+        """
+        neigh_layer = self._params[2]
+        self._red = self._get_box_sum(self.grid == 1, neigh_layer).reshape(-1)
+        self._blue = self._get_box_sum(self.grid == 2, neigh_layer).reshape(-1)
+
+    def _move(self, sources, targets):
+        """
+        Moves agents to empty cells and updates counts, ratios and unhappy agents around changed places.
+        When the windows of the moves cover more cells than the grid, everything is recounted at once.
+        :param sources: flat indices of the agents
+        :type sources: numpy array
+        :param targets: flat indices of their new places
+        :type targets: numpy array
+        """
+        flat = self.grid.reshape(-1)
+        places = np.unique(np.concatenate([sources, targets]))
+        before = flat[places]
+        occupants = flat[sources]
+        flat[sources] = 3
+        flat[targets] = occupants
+        self._record_moves(places, before, flat[places])
+        if 2 * len(sources) * len(self._row_offsets) > flat.size:
+            self._count_windows()
+            cells = np.arange(flat.size)
+        else:
+            windows = self._get_windows(np.concatenate([sources, targets]))
+            signs = np.concatenate([-np.ones(len(sources), dtype=np.int32), np.ones(len(targets), dtype=np.int32)])
+            for counts, occupant in ((self._red, 1), (self._blue, 2)):
+                weights = np.repeat(signs * np.tile(occupants == occupant, 2), windows.shape[1])
+                np.add.at(counts, windows.reshape(-1), weights)
+            cells = np.unique(windows)
+        ratios, unhappy = self._get_cell_ratios(cells)
+        self._ratio_sum += ratios.sum() - self._ratios[cells].sum()
+        self._ratios[cells] = ratios
+        changed = cells[unhappy != self._is_unhappy[cells]]
+        self._is_unhappy[cells] = unhappy
+        for index in changed.tolist():
+            if self._is_unhappy[index]:
+                self._unhappy.add(index)
+            else:
+                self._unhappy.remove(index)
+
+    def _get_windows(self, indices):
+        """
+        Gets flat indices of the periodic windows around cells, the cells included.
+        :param indices: flat indices of the cells
+        :type indices: numpy array
+        :return: array of shape (number of cells, (2 * layer + 1)^2)
+        :rtype: numpy array
+        """
+        n_rows, n_columns = self.grid.shape
+        rows, columns = np.divmod(indices, n_columns)
+        return ((rows[:, None] + self._row_offsets) % n_rows * n_columns
+                + (columns[:, None] + self._column_offsets) % n_columns)
+
+    def _get_cell_ratios(self, cells):
+        """
+        Gets ratios and unhappiness of cells from the window counts.
+        :param cells: flat indices of cells
+        :type cells: numpy array
+        :return: array of ratios, boolean array of unhappy agents
+        :rtype: tuple
+        """
+        occupants = self.grid.reshape(-1)[cells]
+        red, blue = self._red[cells], self._blue[cells]
+        empty = len(self._row_offsets) - red - blue
+        ratio_r, ratio_b, _ = self._params
+        return self._get_ratios(occupants, red - (occupants == 1), blue - (occupants == 2), empty - (occupants == 3),
+                                ratio_r, ratio_b)
+
+
+def _get_hash(places, occupants):
+    """
+    Gets xor of splitmix64 keys of (place, occupant) pairs.
+    :param places: flat indices of cells
+    :type places: numpy array
+    :param occupants: occupants of the cells
+    :type occupants: numpy array
+    :return: hash
+    :rtype: numpy uint64
+    """
+    x = places.astype(np.uint64) * np.uint64(4) + occupants.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return np.bitwise_xor.reduce(x ^ (x >> np.uint64(31)), initial=np.uint64(0))
@@ -1,14 +1,18 @@
+from functools import partial
 import numpy as np
-from lattice import Lattice
-from PIL import Image
+from lattice import Lattice, ArrayLattice, IncrementalLattice
 from matplotlib.colors import ListedColormap
 import matplotlib.pyplot as plt
-import os
-import glob
 from cell import cell
+from frames import GifWriter, AsyncSink
+from sweep import run_sweep, run_sequential
 
+PALETTE = [(0, 0, 0), (255, 0, 0), (0, 0, 255), (128, 128, 128)]
+LATTICES = {'object': Lattice, 'array': ArrayLattice, 'incremental': IncrementalLattice}
 
-def simulate(neigh_layer=1, n_agents=4000, ratio_r=0.5, ratio_b=0.5, gif=False):
+
+def simulate(neigh_layer=1, n_agents=4000, ratio_r=0.5, ratio_b=0.5, gif=False, sink=None, rng=None,
+             engine='array', size=(100, 100), plateau_tol=None, plateau_window=10):
     """
     Simulates agents on lattice.
     :param neigh_layer: layer of neighbours
@@ -19,24 +23,47 @@ def simulate(neigh_layer=1, n_agents=4000, ratio_r=0.5, ratio_b=0.5, gif=False):
     :type ratio_r: float
     :param ratio_b: Ratio for happiness for blue agents
     :type ratio_b: float
-    :param gif: if true gif will be saved
+    :param gif: if true gif will be saved to simulation.gif
     :type gif: bool
+    :param sink: frame sink receiving occupants of the lattice in every iteration, not used together with gif
+    :type sink: FrameSink or None
+    :param rng: random generator or seed
+    :type rng: numpy Generator, int or None
+    :param engine: 'array' keeps an int8 array of occupants, 'incremental' updates neighbour counts of the array
+    only around moved agents, 'object' keeps cell instances (about 100 bytes per cell instead of 1)
+    :type engine: str
+    :param size: number of rows and columns of the lattice
+    :type size: tuple of int
+    :param plateau_tol: if given, simulation stops also when the segregation index changed by at most plateau_tol
+    over the last plateau_window iterations
+    :type plateau_tol: float or None
+    :param plateau_window: number of iterations checked for the plateau
+    :type plateau_window: int
     :return: number of iterations, number of agents, segregation index in last iteration
     """
-    lattice = Lattice()
-    lattice.grid = np.array([cell() for _ in range(10000)]).reshape([100, 100])
+    n_rows, n_columns = size
+    if 2 * n_agents > n_rows * n_columns:
+        raise ValueError(f'{2 * n_agents} agents do not fit on a {n_rows}x{n_columns} lattice')
+    if gif and sink:
+        raise ValueError("gif and sink cannot be used together")
+    lattice = LATTICES[engine](rng=rng)
+    if engine == 'object':
+        lattice.grid = np.array([cell() for _ in range(n_rows * n_columns)]).reshape([n_rows, n_columns])
+    else:
+        lattice.grid = np.full([n_rows, n_columns], 3, dtype=np.int8)
     lattice.start_simulation(n_red=n_agents, n_blue=n_agents)
+    sink = AsyncSink(GifWriter('simulation.gif', PALETTE, duration=1000)) if gif else sink
+    segregation = []
+    while True:
+        if sink:
+            sink.append(_get_occupants_on_array(lattice.grid).reshape(lattice.grid.shape))
+        segregation.append(lattice.change_state(ratio_r=ratio_r, ratio_b=ratio_b, neigh_layer=neigh_layer))
+        if lattice.n_moved == 0 or len(segregation) == 250 or \
+                _check_plateau(segregation, plateau_tol, plateau_window):
+            break
     if gif:
-        _del_remained_pngs()
-    n_iteration, stop = 0, 0
-    while not stop:
-        if gif:
-            plot_grid(lattice.grid, str(n_iteration+1))
-        before_grid = _get_occupants_on_array(lattice.grid)
-        seg = lattice.change_state(ratio_r=ratio_r, ratio_b=ratio_b, neigh_layer=neigh_layer)
-        n_iteration += 1
-        stop = any([_check_change(before_grid, _get_occupants_on_array(lattice.grid)), n_iteration == 250])
-    return n_iteration, n_agents, seg
+        sink.close()
+    return len(segregation), n_agents, segregation[-1]
 
 
 def make_and_save_gif(neigh_layer=1):
@@ -47,7 +74,6 @@ def make_and_save_gif(neigh_layer=1):
     :param edge: edge of lattice where the fire starts
     """
     simulate(neigh_layer=neigh_layer, gif=True)
-    _gif()
 
 
 def plot_grid(grid, name):
@@ -56,120 +82,127 @@ def plot_grid(grid, name):
     :param grid: squared array representing lattice
     :param name: name by which the plot will be saved
     """
-    grid = np.vectorize(lambda x: x.occupant)(grid)
+    grid = _get_occupants_on_array(grid).reshape(grid.shape)
     cmap = ListedColormap(['red', 'blue', 'grey'])
     plt.matshow(grid, cmap=cmap, vmin=1, vmax=3)
     plt.title(name)
     plt.savefig(name)
+    plt.close()
 
 
-def mc_iterations_vs_agents(MC=50):
+def mc_iterations_vs_agents(MC=50, processes=1, seed=None, tol=None):
     """
     Makes plot of number of iterations in simulation vs number of agents.
-    :param MC: number of Monte Cartio repetitions
+    :param MC: number of Monte Cartio repetitions (maximum number when tol is given)
     :type MC: int
+    :param processes: number of processes running the simulations, None uses all cores
+    :type processes: int or None
+    :param seed: seed of the random streams of the simulations
+    :type seed: int or None
+    :param tol: target standard error; if given, simulations are repeated in batches until it is reached
+    :type tol: float or None
+    :return: achieved standard errors when tol is given
+    :rtype: list or None
     """
     n_agents = np.arange(250, 4050, 50)
-    mc_iterations, agents = [], []
-    for n in n_agents:
-        iterations = []
-        for i in range(MC):
-            n_iteration, n_agent, _ = simulate(neigh_layer=1, n_agents=n, gif=False)
-            iterations.append(n_iteration)
-        agents.append(n_agent * 2)
-        mc_iterations.append(sum(iterations)/len(iterations))
-
-    plt.plot(agents, mc_iterations)
+    result = _run_mc(partial(_simulation_run, output=0), [{'neigh_layer': 1, 'n_agents': n} for n in n_agents],
+                     MC, processes, seed, tol)
+    agents = n_agents * 2
+
+    _plot_means(agents, result, tol)
     plt.xlabel('number of agents')
     plt.ylabel('number of iterations')
     plt.title('number of iterations vs number of agents')
     plt.savefig('no_iterations_vs_agents')
+    return result.error if tol else None
 
 
-def MC_segregation_index(ratios_list=np.arange(0.1, 1, 0.1), MC=50):
+def MC_segregation_index(ratios_list=np.arange(0.1, 1, 0.1), MC=50, processes=1, seed=None, tol=None):
     """
     Makes plot of segregation index vs happines ratios in simulations.
     :param ratios_list: list of happines ratios
     :type ratios_list: list of floats
-    :param MC: number of Monte Cartio repetitions
+    :param MC: number of Monte Cartio repetitions (maximum number when tol is given)
     :type MC: int
-    """
-    index_list = []
-    for ratio in ratios_list:
-        i_ratio = []
-        for i in range(MC):
-            _, _, index = simulate(neigh_layer=1, ratio_r=ratio, ratio_b=ratio)
-            i_ratio.append(index)
-        index_list.append(sum(i_ratio)/len(i_ratio))
-    plt.plot(ratios_list, index_list)
+    :param processes: number of processes running the simulations, None uses all cores
+    :type processes: int or None
+    :param seed: seed of the random streams of the simulations
+    :type seed: int or None
+    :param tol: target standard error; if given, simulations are repeated in batches until it is reached
+    :type tol: float or None
+    :return: achieved standard errors when tol is given
+    :rtype: list or None
+    """
+    result = _run_mc(partial(_simulation_run, output=2),
+                     [{'neigh_layer': 1, 'ratio_r': ratio, 'ratio_b': ratio} for ratio in ratios_list],
+                     MC, processes, seed, tol)
+    _plot_means(ratios_list, result, tol)
     plt.xlabel('to-stay ratio')
     plt.ylabel('segregation index')
     plt.title('segregation index vs ratio')
     plt.savefig('segregation_index_vs_ratio')
+    return result.error if tol else None
 
 
-def MC_segregation_vs_layer(layers_list=np.arange(1, 6, 1), MC=50):
+def MC_segregation_vs_layer(layers_list=np.arange(1, 6, 1), MC=50, processes=1, seed=None, tol=None):
     """
     Makes plot of segregation index vs layer of neighbours.
     :param layers_list: list of layers
     :type layers_list: list of ints
-    :param MC: number of Monte Cartio repetitions
+    :param MC: number of Monte Cartio repetitions (maximum number when tol is given)
     :type MC: int
-    """
-    index_list = []
-    for layer in layers_list:
-        i_layer = []
-        for i in range(MC):
-            _, _, index = simulate(neigh_layer=layer)
-            i_layer.append(index)
-        index_list.append(sum(i_layer)/len(i_layer))
-    plt.plot(layers_list, index_list)
+    :param processes: number of processes running the simulations, None uses all cores
+    :type processes: int or None
+    :param seed: seed of the random streams of the simulations
+    :type seed: int or None
+    :param tol: target standard error; if given, simulations are repeated in batches until it is reached
+    :type tol: float or None
+    :return: achieved standard errors when tol is given
+    :rtype: list or None
+    """
+    result = _run_mc(partial(_simulation_run, output=2), [{'neigh_layer': layer} for layer in layers_list],
+                     MC, processes, seed, tol)
+    _plot_means(layers_list, result, tol)
     plt.xlabel('layer number')
     plt.ylabel('segregation index')
     plt.title('segregation index vs layer of neighbours')
     plt.savefig('segregation_index_vs_layer_of_neighbours')
+    return result.error if tol else None
 
 
-def _del_remained_pngs():
+def _run_mc(func, params, MC, processes, seed, tol, batch=10):
     """
-    Deleted png files in working directory.
+    Runs MC simulations for every parameter, or with tol runs them in batches until the standard error
+    of the mean is below tol or MC simulations were made.
+    :return: sweep result
+    :rtype: SweepResult
     """
-    path = os.getcwd()
-    for file in os.listdir(path):
-        if file.endswith('.png'):
-            os.remove(file)
+    if tol is None:
+        return run_sweep(func, params, repetitions=MC, processes=processes, seed=seed)
+    return run_sequential(func, params, tol, batch=min(batch, MC), budget=MC, processes=processes, seed=seed)
 
 
-def _sort_names(name):
+def _plot_means(x, result, tol):
     """
-    Sorts names interpreting them as int
-    :param name: file name
-    :type name: str
-    :return: int
+    Plots means of the sweep, with standard errors as error bars when tol is given.
     """
-    return int(''.join(filter(str.isdigit, name)))
+    if tol is None:
+        plt.plot(x, result.mean)
+    else:
+        plt.errorbar(x, result.mean, yerr=result.error)
 
 
-def _sort_pngs():
+def _simulation_run(kwargs, rng, output):
     """
-    Sorts pngs in working directory.
-    :return: imgs
+    One task of the monte carlo sweep: single simulation.
+    :param kwargs: keyword arguments of simulate
+    :type kwargs: dict
+    :param rng: random generator of the task
+    :param output: index of the value returned by simulate which is kept
+    :type output: int
+    :return: number of iterations (output=0), number of agents (1) or segregation index (2)
     """
-    imgs = glob.glob("*.png")
-    imgs.sort(key=_sort_names)
-    return imgs
-
-
-def _gif():
-    """
-    Creates a gif of neighbours changes on a lattice over time from saved pngs
-    """
-    frames = []
-    imgs = _sort_pngs()
-    for i in imgs:
-        new_frame = Image.open(i)
-        frames.append(new_frame)
-    frames[0].save('simulation.gif', format='GIF', append_images=frames[1:], save_all=True, duration=1000, loop=0)
+    return simulate(rng=rng, **kwargs)[output]
 
 
 def _get_occupants_on_array(array):
@@ -180,19 +213,28 @@ def _get_occupants_on_array(array):
     :return: array of occupant attribute value for cells on the lattice
     :rtype: numpy array
     """
+    if array.dtype != object:
+        return array.reshape(-1).copy()
     return np.array([elem.occupant for _, elem in np.ndenumerate(array)])
 
 
-def _check_change(before, after):
+def _check_plateau(segregation, tol, window):
     """
-    Compares two arrays.
-    :param before: first array to be compared
-    :type before: numpy array
-    :param after: second array to be compared
-    :type after: numpy array
-    :return: True if arrays are the same, false otherwise
+    Checks if segregation index stayed within tol over the last window iterations.
+    :param segregation: segregation indices of all iterations
+    :type segregation: list of floats
+    :param tol: tolerance, None switches the check off
+    :type tol: float or None
+    :param window: number of iterations
+    :type window: int
+    :return: True if the index has plateaued, false otherwise
     :rtype: bool
     """
-    return np.array_equal(before, after)
+    if tol is None or len(segregation) < window:
+        return False
+    last = segregation[-window:]
+    return max(last) - min(last) <= tol
+
 
-make_and_save_gif(neigh_layer=4)
\ No newline at end of file
+if __name__ == '__main__':
+    make_and_save_gif(neigh_layer=4)
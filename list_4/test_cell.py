@@ -0,0 +1,30 @@
+import numpy as np
+from pytest import raises, mark
+from cell import cell, neighbour_table
+
+
+@mark.parametrize("shape, layer", [((5, 7), 1), ((6, 4), 2), ((9, 9), 3)])
+def test_neighbour_table_wraps_layered_neighbours(shape, layer):
+    table = neighbour_table(shape, layer)
+    assert table.shape == (shape[0] * shape[1], (2 * layer + 1) ** 2 - 1) and table.dtype == np.int32
+    for a, b in [(0, 0), (shape[0] - 1, 2), (3, shape[1] - 1)]:
+        expected = [(x % shape[0], y % shape[1]) for x, y in cell.get_layered_neighbours(a, b, layer)]
+        assert [divmod(int(n), shape[1]) for n in table[a * shape[1] + b]] == expected
+        assert cell().get_periodic_neighbours(a, b, layer, list(shape)) == expected
+
+
+def test_neighbour_table_is_cached_and_read_only():
+    table = neighbour_table((10, 10), 1)
+    assert neighbour_table((10, 10), 1) is table
+    with raises(ValueError):
+        table[0, 0] = 1
+
+
+def test_periodic_neighbours_of_one_cell_do_not_build_table():
+    neighbour_table.cache_clear()
+    assert len(cell().get_periodic_neighbours(0, 0, layer=5, size=[4096, 4096])) == 120
+    assert neighbour_table.cache_info().currsize == 0
+
+
+def test_cell_has_no_instance_dict():
+    assert not hasattr(cell(), '__dict__') and not hasattr(cell(np.zeros([2, 2]), (0, 1)), '__dict__')
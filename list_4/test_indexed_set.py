@@ -0,0 +1,27 @@
+import numpy as np
+from pytest import raises
+from indexed_set import IndexedSet
+
+
+def test_indexed_set_add_remove_and_choice():
+    items = IndexedSet([(0, 0), (0, 1), (1, 0)])
+    items.add((0, 1))
+    assert len(items) == 3
+    items.remove((0, 0))
+    assert (0, 0) not in items and set(items) == {(0, 1), (1, 0)}
+    items.add((2, 2))
+    rng = np.random.default_rng(0)
+    assert {items.choice(rng) for _ in range(100)} == {(0, 1), (1, 0), (2, 2)}
+    with raises(KeyError):
+        items.remove((0, 0))
+
+
+def test_indexed_set_keeps_positions_after_swap_remove():
+    items = IndexedSet(range(10))
+    for item in [3, 9, 0, 5]:
+        items.remove(item)
+    assert sorted(items) == [1, 2, 4, 6, 7, 8]
+    assert [items[k] for k in range(len(items))] == list(items)
+    for item in list(items):
+        items.remove(item)
+    assert len(items) == 0
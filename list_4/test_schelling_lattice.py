@@ -0,0 +1,124 @@
+import numpy as np
+from unittest.mock import patch
+from pytest import approx, mark
+from cell import cell
+from lattice import Lattice, ArrayLattice, IncrementalLattice
+
+
+def _random_occupants(shape=(12, 15), seed=0):
+    return np.random.default_rng(seed).choice(np.array([1, 2, 3], dtype=np.int8), size=shape, p=[0.35, 0.35, 0.3])
+
+
+def _object_lattice(occupants):
+    lattice = Lattice()
+    lattice.grid = np.array([cell() for _ in range(occupants.size)]).reshape(occupants.shape)
+    for index, occupant in np.ndenumerate(occupants):
+        lattice.grid[index].occupant = int(occupant)
+    return lattice
+
+
+@mark.parametrize("neigh_layer, ratio_r, ratio_b", [(1, 0.5, 0.5), (2, 0.3, 0.7), (3, 0.6, 0.4)])
+def test_array_lattice_matches_object_lattice(neigh_layer, ratio_r, ratio_b):
+    occupants = _random_occupants(seed=neigh_layer)
+    reference = _object_lattice(occupants)
+    with patch.object(Lattice, '_shuffle_unhappy_agents') as shuffle:
+        expected = reference.change_state(ratio_r=ratio_r, ratio_b=ratio_b, neigh_layer=neigh_layer)
+    unhappy = {index for index, _ in shuffle.call_args[0][0]}
+
+    lattice = ArrayLattice(rng=0)
+    lattice.grid = occupants.copy()
+    _, unhappy_mask = lattice._get_happiness(ratio_r, ratio_b, neigh_layer)
+    assert {tuple(index) for index in np.argwhere(unhappy_mask)} == unhappy
+    assert lattice.change_state(ratio_r=ratio_r, ratio_b=ratio_b, neigh_layer=neigh_layer) == approx(expected)
+
+
+def test_array_lattice_moves_only_unhappy_agents():
+    lattice = ArrayLattice(rng=1)
+    lattice.grid = _random_occupants(shape=(20, 20))
+    before = lattice.grid.copy()
+    _, unhappy = lattice._get_happiness(0.5, 0.5, 1)
+    lattice.change_state()
+    assert np.array_equal(lattice.grid[~unhappy & (before != 3)], before[~unhappy & (before != 3)])
+    for occupant in (1, 2, 3):
+        assert (lattice.grid == occupant).sum() == (before == occupant).sum()
+
+
+def test_array_lattice_start_simulation():
+    lattice = ArrayLattice(rng=2)
+    lattice.grid = np.full([10, 10], 3, dtype=np.int8)
+    lattice.start_simulation(n_red=30, n_blue=20)
+    assert (lattice.grid == 1).sum() == 30 and (lattice.grid == 2).sum() == 20
+
+
+def test_object_lattice_keeps_free_cells_up_to_date():
+    lattice = Lattice(rng=3)
+    lattice.grid = np.array([cell() for _ in range(100)]).reshape([10, 10])
+    lattice.start_simulation(n_red=35, n_blue=35)
+    for _ in range(3):
+        lattice.change_state()
+        assert sorted(lattice._free) == lattice._get_empty_spaces()
+    occupants = np.vectorize(lambda x: x.occupant)(lattice.grid)
+    assert (occupants == 1).sum() == 35 and (occupants == 2).sum() == 35
+
+
+@mark.parametrize("move_all_fraction", [0.25, float('inf')])
+@mark.parametrize("neigh_layer", [1, 3])
+def test_incremental_lattice_keeps_counts_up_to_date(neigh_layer, move_all_fraction):
+    lattice = IncrementalLattice(rng=4)
+    lattice.move_all_fraction = move_all_fraction
+    lattice.grid = _random_occupants(shape=(16, 13), seed=5)
+    reference = ArrayLattice()
+    for _ in range(4):
+        reference.grid = lattice.grid.copy()
+        ratios, unhappy = reference._get_happiness(0.4, 0.6, neigh_layer)
+        assert lattice.change_state(ratio_r=0.4, ratio_b=0.6, neigh_layer=neigh_layer) == approx(ratios.mean())
+    reference.grid = lattice.grid.copy()
+    ratios, unhappy = reference._get_happiness(0.4, 0.6, neigh_layer)
+    np.testing.assert_allclose(lattice._ratios, ratios.reshape(-1))
+    assert lattice._ratio_sum == approx(ratios.sum())
+    np.testing.assert_array_equal(lattice._is_unhappy, unhappy.reshape(-1))
+    if lattice._unhappy is not None:
+        assert sorted(lattice._unhappy) == np.flatnonzero(unhappy).tolist()
+        assert sorted(lattice._free) == np.flatnonzero(lattice.grid == 3).tolist()
+
+
+def test_incremental_lattice_moves_all_agents_at_once_when_many_are_unhappy():
+    lattice = IncrementalLattice(rng=8)
+    lattice.grid = _random_occupants(shape=(30, 30), seed=9)
+    with patch.object(IncrementalLattice, '_move') as move:
+        lattice.change_state(neigh_layer=2)
+    move.assert_not_called()
+    assert lattice._unhappy is None
+    for _ in range(20):
+        lattice.change_state(neigh_layer=2)
+    assert lattice._unhappy is not None and len(lattice._unhappy) * 25 <= lattice.move_all_fraction * lattice.grid.size
+
+
+@mark.parametrize("engine", ['object', 'array', 'incremental'])
+def test_lattices_count_moves_and_update_board_hash(engine):
+    occupants = _random_occupants(shape=(10, 12), seed=6)
+    if engine == 'object':
+        lattice = _object_lattice(occupants)
+        lattice.rng = np.random.default_rng(7)
+    else:
+        lattice = {'array': ArrayLattice, 'incremental': IncrementalLattice}[engine](rng=7)
+        lattice.grid = occupants.copy()
+    lattice.board_hash
+    for _ in range(3):
+        before = lattice._get_occupants().copy()
+        lattice.change_state()
+        after = lattice._get_occupants()
+        assert lattice.n_moved == np.count_nonzero((before != after) & (after != 3))
+        reference = ArrayLattice()
+        reference.grid = after.reshape(occupants.shape).copy()
+        assert lattice.board_hash == reference.board_hash
+    assert lattice.board_hash != _object_lattice(occupants).board_hash
+
+
+def test_incremental_lattice_keeps_agents_in_place_on_full_lattice():
+    lattice = IncrementalLattice(rng=10)
+    lattice.move_all_fraction = float('inf')
+    lattice.grid = np.random.default_rng(11).choice(np.array([1, 2], dtype=np.int8), size=(10, 10))
+    before = lattice.grid.copy()
+    lattice.change_state()
+    assert np.array_equal(lattice.grid, before) and lattice.n_moved == 0
@@ -0,0 +1,44 @@
+import numpy as np
+from unittest.mock import Mock
+from pytest import raises, mark
+from cell import cell
+from lattice import ArrayLattice
+from simulation import simulate
+
+
+@mark.parametrize("engine", ['array', 'incremental', 'object'])
+def test_simulate_on_rectangular_lattice(engine):
+    n_iteration, n_agents, segregation = simulate(n_agents=150, size=(20, 30), rng=0, engine=engine)
+    assert 1 <= n_iteration <= 250 and n_agents == 150
+    assert 0 < segregation <= 1
+
+
+def test_simulate_rejects_too_many_agents():
+    with raises(ValueError):
+        simulate(n_agents=301, size=(20, 30))
+
+
+def test_simulate_rejects_gif_with_sink():
+    with raises(ValueError):
+        simulate(n_agents=10, size=(10, 10), gif=True, sink=Mock())
+
+
+def test_cell_views_element_of_grid():
+    lattice = ArrayLattice()
+    lattice.grid = np.full([4, 6], 3, dtype=np.int8)
+    view = lattice.get_cell((1, 5))
+    view.occupant = 2
+    assert lattice.grid[1, 5] == 2 and view.occupant == 2
+    assert sorted(view.get_periodic_neighbours(1, 5)) == sorted(cell().get_periodic_neighbours(1, 5, size=[4, 6]))
+
+
+def test_simulate_stops_when_segregation_plateaus():
+    n_iteration, *_ = simulate(n_agents=4000, rng=1)
+    assert simulate(n_agents=4000, rng=1, plateau_tol=0.01, plateau_window=3)[0] < n_iteration
+
+
+@mark.parametrize("engine", ['array', 'incremental', 'object'])
+def test_simulate_on_full_lattice(engine):
+    n_iteration, n_agents, segregation = simulate(n_agents=50, size=(10, 10), rng=1, engine=engine)
+    assert 1 <= n_iteration <= 250 and n_agents == 50
+    assert 0 <= segregation <= 1
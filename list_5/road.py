@@ -1,29 +1,55 @@
 import numpy as np
 from cell import cell
-from random import random
 
 
 class Road:
+    """
+    Circular road with cars kept as sorted arrays of their positions and velocities.
+    :param rng: random generator or seed
+    :type rng: numpy Generator, int or None
+    :param length: number of cells of the road
+    :type length: int
+    """
 
-    def __init__(self):
-        self._grid = np.array([cell() for _ in range(100)]).reshape([1, 100])
+    def __init__(self, rng=None, length=100):
+        self.length = length
+        self.positions = np.zeros(0, dtype=np.int64)
+        self.velocities = np.zeros(0, dtype=np.int64)
+        self.rng = np.random.default_rng(rng)
 
     @property
     def grid(self):
         """
-        Grid attribute property.
+        Grid attribute property, road as cell instances built from the cars.
         :return: grid
-        :rtype: None or setted value - numpy array
+        :rtype: numpy array of shape (1, length)
         """
-        return self._grid
+        grid = np.array([cell() for _ in range(self.length)]).reshape([1, self.length])
+        for position, velocity in zip(self.positions, self.velocities):
+            grid[0, position].occupant = 1
+            grid[0, position].velocity = int(velocity)
+        return grid
 
     @grid.setter
     def grid(self, val):
         """
-        Grid attribute setter.
-        :param val: value that will be assigned to grid attribute
+        Grid attribute setter, reads cars from cell instances.
+        :param val: array of cell instances of shape (1, length)
         """
-        self._grid = val
+        self.length = val.shape[1]
+        self.positions = np.array([n for n, elem in enumerate(val[0]) if elem.occupant], dtype=np.int64)
+        self.velocities = np.array([val[0, n].velocity for n in self.positions], dtype=np.int64)
+
+    @property
+    def occupancy(self):
+        """
+        Occupancy of the road.
+        :return: 1 for cells with a car, 0 otherwise
+        :rtype: numpy array of shape (1, length)
+        """
+        occupancy = np.zeros([1, self.length], dtype=np.uint8)
+        occupancy[0, self.positions] = 1
+        return occupancy
 
     def start_simulation(self, rho=0.1):
         """
@@ -31,79 +57,38 @@ class Road:
         :param rho: probability of car on cell on the road
         :type rho: float
         """
-        for index, elem in np.ndenumerate(self.grid):
-            if random() <= rho:
-                self.grid[index].occupant = 1
+        draws = self.rng.random(self.length)
+        self.positions = np.flatnonzero(draws <= rho)
+        self.velocities = np.zeros(len(self.positions), dtype=np.int64)
 
     def change_state(self, p, max_v):
         """
-        Changes state of cars on the road.
+        Changes state of cars on the road. Every car accelerates by one if it is slower than max_v and the gap
+        in front of it allows, then slows down by one with probability p. It moves by its velocity if the gap allows,
+        otherwise it stays and brakes to the gap.
         :param p: probability for randomization
         :type p: float
         :param max_v: maximum velocity of cars
         :type max_v: int
         :return: average velocity of cars on the road
-        :rtype: int or float
-        """
-        grid = self.grid.copy()
-        cars_to_move, velocities = [], []
-        for index, elem in np.ndenumerate(grid):
-
-            distance = elem._check_distance_to_closest_car(index, grid, max_v)
-            self._adjust_velocity_of_car(elem, max_v, distance, p, index, cars_to_move)
-
-            if elem.occupant:
-                velocities.append(elem.velocity)
-
-        for car in cars_to_move:
-            self._move_car(car[0], car[1])
-
-        return sum(velocities)/len(velocities)
-
-    def _adjust_velocity_of_car(self, elem, max_v, distance, p, index, cars_to_move):
-        """
-        Adjusts velocity of car
-        :param elem: cell instance
-        :param max_v: maximum velocity
-        :param distance: distance to closest car
-        :param p: probability for randomization
-        :param index: coordinates of car on the road
-        :param cars_to_move: list of cars to be moved
-        """
-        if elem.occupant and elem.velocity < max_v and elem.velocity < distance - 1:
-            elem.velocity += 1
-        if elem.velocity:
-            self._randomize(p, elem)
-        if elem.occupant and elem.velocity:
-            if elem.velocity < distance:
-                cars_to_move.append([index, elem])
-            else:
-                elem.velocity = distance - 1
-
-    @staticmethod
-    def _randomize(p, elem):
-        """
-        Decreases car velocity by one with probability p
-        :param p: probability
-        :type p: float
-        :param elem: cell instance
-        :type elem: cell class instance
+        :rtype: float
         """
-        if random() < p and elem.velocity:
-            elem.velocity -= 1
+        draws = self.rng.random(self.length)[self.positions]
+        distance = np.minimum(self._get_gaps() + 1, max_v)
+        velocities = self.velocities + ((self.velocities < max_v) & (self.velocities < distance - 1))
+        velocities -= (draws < p) & (velocities > 0)
+        moving = velocities < distance
+        self.velocities = np.where(moving, velocities, distance - 1)
+        positions = np.where(moving, self.positions + velocities, self.positions)
+        wrapped = np.count_nonzero(positions >= self.length)
+        self.positions = np.roll(positions % self.length, wrapped)
+        self.velocities = np.roll(self.velocities, wrapped)
+        return int(self.velocities.sum()) / len(self.velocities)
 
-    def _move_car(self, index, elem, length=100):
+    def _get_gaps(self):
         """
-        Moves car on the road
-        :param index: coordinates of car on the road
-        :type index: tuple
-        :param elem: cell instance
-        :type elem: cell class instance
-        :param length: length of the road
-        :type length: int
+        Gets numbers of empty cells in front of every car.
+        :return: gaps
+        :rtype: numpy array
         """
-        if index[1]+elem.velocity < length:
-            self.grid[(index[0], index[1]+elem.velocity)] = elem
-        else:
-            self.grid[(index[0], abs(length - (index[1] + elem.velocity)))] = elem
-        self.grid[index] = cell()
+        return np.diff(self.positions, append=self.positions[:1] + self.length) - 1
@@ -1,31 +1,37 @@
 from road import Road
 import numpy as np
-from PIL import Image
 from matplotlib.colors import ListedColormap
 import matplotlib.pyplot as plt
-import os
-import glob
+from frames import GifWriter, AsyncSink
+from sweep import run_sweep, run_sequential
 
+PALETTE = [(0, 0, 0), (255, 0, 0)]
 
-def simulate(rho=0.1, p=0.2, max_v=5, gif=False):
+
+def simulate(rho=0.1, p=0.2, max_v=5, gif=False, sink=None, rng=None):
     """
     Simulates movement of cars on the road.
     :param rho: probability of car on cell on the road
     :param p: probability for randomization
     :param max_v: maximum velocity of car
-    :param gif: boolean if gif should be made
+    :param gif: boolean if gif should be made (saved to simulation.gif)
+    :param sink: frame sink receiving occupants of the road in every step, not used together with gif
+    :param rng: random generator or seed
     :return: average velocity of cars
     """
-    if gif:
-        _del_remained_pngs()
-    road = Road()
+    if gif and sink:
+        raise ValueError("gif and sink cannot be used together")
+    sink = AsyncSink(GifWriter('simulation.gif', PALETTE, duration=1000, scale=8)) if gif else sink
+    road = Road(rng=rng)
     road.start_simulation(rho=rho)
     vel = []
     for i in range(100):
-        if gif:
-            plot_grid(road.grid, str(i+1), rho, p)
+        if sink:
+            sink.append(road.occupancy)
         avg_v = road.change_state(p, max_v)
         vel.append(avg_v)
+    if gif:
+        sink.close()
     return sum(vel)/len(vel)
 
 
@@ -37,7 +43,6 @@ def make_and_save_gif(rho=0.1, p=0.2, max_v=5):
     :param max_v: maximum velocity
     """
     simulate(rho=rho, p=p, max_v=max_v, gif=True)
-    _gif()
 
 
 def plot_grid(grid, name, rho, p):
@@ -53,69 +58,53 @@ def plot_grid(grid, name, rho, p):
     plt.matshow(grid, cmap=cmap, vmin=0, vmax=1)
     plt.title("simulation for rho: {} and p: {} ".format(rho, p))
     plt.savefig(name)
+    plt.close()
 
 
-def plot_avg_v_vs_rho():
+def plot_avg_v_vs_rho(MC=1, processes=1, seed=None, tol=None):
     """
     Plots average velocity over rho
+    :param MC: number of simulations averaged for every rho and p (maximum number when tol is given)
+    :param processes: number of processes running the simulations, None uses all cores
+    :param seed: seed of the random streams of the simulations
+    :param tol: target standard error of the average velocity; if given, simulations are repeated in batches
+    until it is reached or MC simulations were made
+    :return: achieved standard errors per p and rho when tol is given
     """
     rho = np.arange(0.05, 1, 0.05)
     ps = [0.2, 0.5, 0.7]
-    avg_v_vs_rho = []
+    params = [(r, p) for p in ps for r in rho]
+    if tol is None:
+        result = run_sweep(_simulation_run, params, repetitions=MC, processes=processes, seed=seed)
+    else:
+        result = run_sequential(_simulation_run, params, tol, batch=min(10, MC), budget=MC, processes=processes,
+                                seed=seed)
+    avg_v_vs_rho = np.reshape(result.mean, [len(ps), len(rho)])
     for p in range(len(ps)):
-        v_vs_rho = []
-        for r in rho:
-            v_vs_rho.append(simulate(r, ps[p]))
-        avg_v_vs_rho.append(v_vs_rho)
-        plt.plot(rho, avg_v_vs_rho[p], label="p={}".format(ps[p]))
+        if tol is None:
+            plt.plot(rho, avg_v_vs_rho[p], label="p={}".format(ps[p]))
+        else:
+            errors = np.reshape(result.error, [len(ps), len(rho)])
+            plt.errorbar(rho, avg_v_vs_rho[p], yerr=errors[p], label="p={}".format(ps[p]))
 
     plt.title("average velocity vs rho")
     plt.xlabel("rho")
     plt.ylabel("average velocity")
     plt.legend()
     plt.show()
+    return np.reshape(result.error, [len(ps), len(rho)]) if tol else None
 
 
-def _del_remained_pngs():
-    """
-    Deleted png files in working directory.
-    """
-    path = os.getcwd()
-    for file in os.listdir(path):
-        if file.endswith('.png'):
-            os.remove(file)
-
-
-def _sort_names(name):
-    """
-    Sorts names interpreting them as int
-    :param name: file name
-    :type name: str
-    :return: int
-    """
-    return int(''.join(filter(str.isdigit, name)))
-
-
-def _sort_pngs():
-    """
-    Sorts pngs in working directory.
-    :return: imgs
-    """
-    imgs = glob.glob("*.png")
-    imgs.sort(key=_sort_names)
-    return imgs
-
-
-def _gif():
+def _simulation_run(params, rng):
     """
-    Creates a gif of cars' position changes on road over time from saved pngs
+    One task of the monte carlo sweep: single simulation.
+    :param params: rho and p
+    :param rng: random generator of the task
+    :return: average velocity of cars
     """
-    frames = []
-    imgs = _sort_pngs()
-    for i in imgs:
-        new_frame = Image.open(i)
-        frames.append(new_frame)
-    frames[0].save('simulation.gif', format='GIF', append_images=frames[1:], save_all=True, duration=1000, loop=0)
+    rho, p = params
+    return simulate(rho, p, rng=rng)
 
 
-plot_avg_v_vs_rho()
\ No newline at end of file
+if __name__ == '__main__':
+    plot_avg_v_vs_rho()
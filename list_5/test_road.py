@@ -0,0 +1,38 @@
+import numpy as np
+from cell import cell
+from road import Road
+
+
+def test_cars_keep_order_and_gaps():
+    road = Road(rng=0)
+    road.start_simulation(rho=0.4)
+    n_cars = len(road.positions)
+    for _ in range(50):
+        road.change_state(0.3, 5)
+        assert len(road.positions) == n_cars
+        assert np.all(np.diff(road.positions) > 0) and 0 <= road.positions[0] and road.positions[-1] < 100
+        assert np.all((0 <= road.velocities) & (road.velocities <= 5))
+
+
+def test_deterministic_cars_accelerate_brake_and_wrap():
+    road = Road(length=10)
+    road.positions, road.velocities = np.array([0, 3, 9]), np.array([0, 2, 1])
+    assert road.change_state(0, 5) == 4 / 3
+    np.testing.assert_array_equal(road.positions, [1, 6, 9])
+    np.testing.assert_array_equal(road.velocities, [1, 3, 0])
+    road.change_state(0, 5)
+    np.testing.assert_array_equal(road.positions, [0, 3, 6])
+    np.testing.assert_array_equal(road.velocities, [1, 2, 2])
+
+
+def test_grid_is_built_from_cars_and_read_back():
+    road = Road(rng=1)
+    road.start_simulation(rho=0.3)
+    road.change_state(0.2, 5)
+    grid = road.grid
+    assert grid.shape == (1, 100) and isinstance(grid[0, 0], cell)
+    np.testing.assert_array_equal(np.vectorize(lambda x: x.occupant)(grid), road.occupancy)
+    copy = Road()
+    copy.grid = grid
+    np.testing.assert_array_equal(copy.positions, road.positions)
+    np.testing.assert_array_equal(copy.velocities, road.velocities)
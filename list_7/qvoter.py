@@ -1,7 +1,8 @@
+from functools import partial
 import numpy as np
 import matplotlib.pyplot as plt
 import networkx as nx
-from random import randint, random, choices
+from sweep import run_sweep
 
 
 def magnetization(opinions):
@@ -27,28 +28,30 @@ def _set_initial_opinions(graph):
     return graph
 
 
-def init_graph(type_name, q):
+def init_graph(type_name, q, seed=None):
     '''
     function that returns graph with certain type
     :param type_name: type of graph
     :type type_name: str
     :param q: number of neighbours for each node
     :type q: int
+    :param seed: seed of random graph generators
+    :type seed: int or None
     :return: networkx graph instance, label
     '''
     if type_name == 'random':
-        return nx.random_regular_graph(q, 100), type_name
+        return nx.random_regular_graph(q, 100, seed=seed), type_name
     elif type_name == 'complete':
         return nx.complete_graph(q + 1), type_name
     elif type_name == 'barabasi_albert':
-        return nx.barabasi_albert_graph(100, q), type_name
+        return nx.barabasi_albert_graph(100, q, seed=seed), type_name
     elif type_name == 'watts_strogatz_1':
-        return nx.watts_strogatz_graph(100, q, 0.01), type_name
+        return nx.watts_strogatz_graph(100, q, 0.01, seed=seed), type_name
     elif type_name == 'watts_strogatz_2':
-        return nx.watts_strogatz_graph(100, q, 0.2), type_name
+        return nx.watts_strogatz_graph(100, q, 0.2, seed=seed), type_name
 
 
-def q_voter(p_independent=0.5, f=0.5, q=4, steps=50):
+def q_voter(p_independent=0.5, f=0.5, q=4, steps=50, rng=None):
     '''
     function that returns graph and magnetization value after given number of steps
     :param graph: graph class
@@ -61,17 +64,23 @@ def q_voter(p_independent=0.5, f=0.5, q=4, steps=50):
     :type q: int
     :param steps: number of steps
     :type steps: int
+    :param rng: random generator or seed
+    :type rng: numpy Generator, int or None
     :return: networkx graph instance, list of magnetization values per step
     '''
+    rng = np.random.default_rng(rng)
     type_name = 'complete'
-    graph, _ = init_graph(type_name, q)
+    graph, _ = init_graph(type_name, q, seed=int(rng.integers(2 ** 32)))
     no_of_nodes = len(list(graph.nodes(data=True)))
     _set_initial_opinions(graph)
     m_per_time_step = []
+    chosen = rng.integers(0, no_of_nodes, size=steps)
+    independent, flips = rng.random(steps), rng.random(steps)
+    picks = rng.random([steps, q])
     for step in range(steps):
-        s = randint(0, no_of_nodes - 1)
-        if random() < p_independent:
-            if random() < f:
+        s = chosen[step]
+        if independent[step] < p_independent:
+            if flips[step] < f:
                 if graph.nodes[s]["opinion"] == 1:
                     graph.nodes[s]["opinion"] = 0
                 else:
@@ -79,7 +88,7 @@ def q_voter(p_independent=0.5, f=0.5, q=4, steps=50):
         else:
             neighbors = graph.neighbors(s)
             neighbors_list = list(neighbors)
-            neighbors_chosen = choices(neighbors_list, k=q)
+            neighbors_chosen = [neighbors_list[k] for k in (picks[step] * len(neighbors_list)).astype(int)]
             sum_of_neigh_opinions = 0
             for neighbor in neighbors_chosen:
                 sum_of_neigh_opinions += graph.nodes[neighbor]["opinion"]
@@ -96,7 +105,7 @@ def q_voter(p_independent=0.5, f=0.5, q=4, steps=50):
 # g, m = q_voter(graph)
 
 
-def monte_carlo(monte_carlo_steps, f, q=4, steps=50):
+def monte_carlo(monte_carlo_steps, f, q=4, steps=50, processes=1, seed=None):
     '''
     function that applies monte carlo method
     :param monte_carlo_steps: monte carlo steps
@@ -107,35 +116,47 @@ def monte_carlo(monte_carlo_steps, f, q=4, steps=50):
     :type f: float
     :param steps: number of steps
     :type steps: int
+    :param processes: number of processes running the simulations, None uses all cores
+    :type processes: int or None
+    :param seed: seed of the random streams of the simulations
+    :type seed: int or None
     :return: average magnetization, list with all magnetization values
     '''
     p = np.linspace(0, 1, 100)
-    avg_m = []
-    allall_m = []
-    for prob in p:
-        all_m = []
-        for step in range(monte_carlo_steps):
-            _, m = q_voter(p_independent=prob, f=f, q=q, steps=steps)
-            all_m.append(m)
-        avg = [np.mean(i) for i in zip(*all_m)]
-        avg_m.append(avg)
-        allall_m.append(all_m)
+    result = run_sweep(partial(_q_voter_run, f=f, q=q, steps=steps), p, repetitions=monte_carlo_steps,
+                       processes=processes, seed=seed)
+    avg_m = [list(avg) for avg in result.mean]
+    allall_m = result.samples
     return avg_m, allall_m
 
 
+def _q_voter_run(p_independent, rng, f, q, steps):
+    '''
+    function that runs one task of the monte carlo sweep
+    :param p_independent: probability of independence of node
+    :type p_independent: float
+    :param rng: random generator of the task
+    :return: list of magnetization values per step
+    '''
+    _, m = q_voter(p_independent=p_independent, f=f, q=q, steps=steps, rng=rng)
+    return m
+
+
 # avg_m, allall_m = monte_carlo(100, graph, f=0.2, q=4, steps=50)
 
-def final_mag_for_all_topo_mc(q):
+def final_mag_for_all_topo_mc(q, processes=1):
     '''
     function that plots average magnetization per p (monte carlo)
     :param q: number of neighbours for each node
     :type q: int
+    :param processes: number of processes running the simulations, None uses all cores
+    :type processes: int or None
     '''
     f_prob_list = [0.2, 0.3, 0.4, 0.5]
     for f in f_prob_list:
         p = np.linspace(0, 1, 100)
         avg_m_per_p = []
-        avg_m, _ = monte_carlo(100, f, q=4, steps=100)
+        avg_m, _ = monte_carlo(100, f, q=4, steps=100, processes=processes)
         for i in range(len(avg_m)):
             avg_m_per_p.append(np.mean(avg_m[i]))
         plt.plot(p, avg_m_per_p, 'o', label='f = ' + str(f))
@@ -146,7 +167,8 @@ def final_mag_for_all_topo_mc(q):
     plt.show()
 
 
-final_mag_for_all_topo_mc(q=4)
+if __name__ == '__main__':
+    final_mag_for_all_topo_mc(q=4)
 
 
 
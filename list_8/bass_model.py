@@ -1,11 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import networkx as nx
-from random import random, sample
 from itertools import zip_longest
+from sweep import run_sweep, run_sequential
 
 
-def init_graph(type_name, q, n_of_agents):
+def init_graph(type_name, q, n_of_agents, seed=None):
     '''
     function that returns graph with certain type
     :param type_name: type of graph
@@ -14,21 +14,23 @@ def init_graph(type_name, q, n_of_agents):
     :type q: int
     :param n_of_agents: number of agents
     :type n_of_agents: int
+    :param seed: seed of random graph generators
+    :type seed: int or None
     :return: networkx graph instance, label
     '''
     if type_name == 'random':
-        return nx.random_regular_graph(q, n_of_agents), type_name
+        return nx.random_regular_graph(q, n_of_agents, seed=seed), type_name
     elif type_name == 'complete':
         return nx.complete_graph(q + 1), type_name
     elif type_name == 'barabasi_albert':
-        return nx.barabasi_albert_graph(n_of_agents, q), type_name
+        return nx.barabasi_albert_graph(n_of_agents, q, seed=seed), type_name
     elif type_name == 'watts_strogatz_1':
-        return nx.watts_strogatz_graph(n_of_agents, q, 0.01), type_name
+        return nx.watts_strogatz_graph(n_of_agents, q, 0.01, seed=seed), type_name
     elif type_name == 'watts_strogatz_2':
-        return nx.watts_strogatz_graph(n_of_agents, q, 0.2), type_name
+        return nx.watts_strogatz_graph(n_of_agents, q, 0.2, seed=seed), type_name
 
 
-def bass_model(p=0.7, q=0.5, k=8, type_name='barabasi_albert', no_of_innovators=80, n_of_agents=500):
+def bass_model(p=0.7, q=0.5, k=8, type_name='barabasi_albert', no_of_innovators=80, n_of_agents=500, rng=None):
     '''
     function that returns graph and magnetization value after given number of steps
     :param p: probability coef of buying the product for innovator
@@ -43,20 +45,24 @@ def bass_model(p=0.7, q=0.5, k=8, type_name='barabasi_albert', no_of_innovators=
     :type no_of_innovators: int
     :param n_of_agents: number of agents
     :type n_of_agents: int
+    :param rng: random generator or seed
+    :type rng: numpy Generator, int or None
     :return: networkx graph instance, list of magnetization values per step
     '''
-    graph, _ = init_graph(type_name, k, n_of_agents)
+    rng = np.random.default_rng(rng)
+    graph, _ = init_graph(type_name, k, n_of_agents, seed=int(rng.integers(2 ** 32)))
     no_of_nodes = len(list(graph.nodes(data=True)))
-    graph = _split_community_to_innovators_and_imitators(graph, no_of_innovators)
+    graph = _split_community_to_innovators_and_imitators(graph, no_of_innovators, rng)
     n_per_time_step, n = [], 0
     while n < n_of_agents:
         gr = graph
         m = 0
+        draws = rng.random([no_of_nodes, 2])
         for node in range(0, no_of_nodes):
-            if random() < p*(1 - n/n_of_agents) and gr.nodes[node]["type"] and not gr.nodes[node]["bought"]:
+            if draws[node, 0] < p*(1 - n/n_of_agents) and gr.nodes[node]["type"] and not gr.nodes[node]["bought"]:
                 graph.nodes[node]["bought"] = 1
                 m += 1
-            elif random() < q*n/n_of_agents:
+            elif draws[node, 1] < q*n/n_of_agents:
                 neighbors_list = [gr.nodes[i]["bought"] for i in list(gr.neighbors(node))]
                 if all(
                         (
@@ -96,23 +102,28 @@ def plot_new_sales_per_group(n_per_time_step):
     plt.show()
 
 
-def mc_new_sales_per_group(MC=50):
+def mc_new_sales_per_group(MC=50, processes=1, seed=None, tol=None):
     """
     Plots new adopters in monte carlo
-    :param MC: number of Monte Carlo repetitions
+    :param MC: number of Monte Carlo repetitions (maximum number when tol is given)
     :type MC: int
+    :param processes: number of processes running the simulations, None uses all cores
+    :type processes: int or None
+    :param seed: seed of the random streams of the simulations
+    :type seed: int or None
+    :param tol: target standard error of new adopters in every time step; if given, simulations are repeated
+    in batches until it is reached or MC simulations were made
+    :type tol: float or None
+    :return: achieved standard errors of new innovators and imitators per time step when tol is given
+    :rtype: numpy array or None
     """
-    in_sales_all, im_sales_all, all = [], [], []
-    for i in range(MC):
-        graph, n_per_time_step = \
-            bass_model(p=0.35, q=0.4, k=8, type_name='barabasi_albert', no_of_innovators=130, n_of_agents=700)
-        in_sales = [n_per_time_step[x]["innovators"] - n_per_time_step[x - 1]["innovators"] if x > 0
-                    else n_per_time_step[x]["innovators"] for x in range(len(n_per_time_step))]
-        im_sales = [n_per_time_step[x]["imitators"] - n_per_time_step[x - 1]["imitators"] if x > 0
-                    else n_per_time_step[x]["imitators"] for x in range(len(n_per_time_step))]
-
-        in_sales_all.append(in_sales)
-        im_sales_all.append(im_sales)
+    if tol is None:
+        result = run_sweep(_new_sales_run, [None], repetitions=MC, processes=processes, seed=seed, reduce=False)
+    else:
+        result = run_sequential(_new_sales_run, [None], tol, batch=min(10, MC), budget=MC, processes=processes,
+                                seed=seed, stack=_stack_sales)
+    in_sales_all = [in_sales for in_sales, _ in result.samples[0]]
+    im_sales_all = [im_sales for _, im_sales in result.samples[0]]
 
     plt.plot(_column_wise_avg(in_sales_all))
     plt.plot(_column_wise_avg(im_sales_all))
@@ -122,19 +133,39 @@ def mc_new_sales_per_group(MC=50):
     plt.ylabel('new adopters')
     plt.title('new adopters in time')
     plt.show()
+    return result.error[0] if tol else None
 
 
-def _split_community_to_innovators_and_imitators(graph, no_of_innovators):
+def _new_sales_run(_, rng):
+    """
+    Runs one task of the monte carlo sweep.
+    :param rng: random generator of the task
+    :return: new sales of innovators and of imitators per time step
+    :rtype: tuple
+    """
+    graph, n_per_time_step = \
+        bass_model(p=0.35, q=0.4, k=8, type_name='barabasi_albert', no_of_innovators=130, n_of_agents=700, rng=rng)
+    in_sales = [n_per_time_step[x]["innovators"] - n_per_time_step[x - 1]["innovators"] if x > 0
+                else n_per_time_step[x]["innovators"] for x in range(len(n_per_time_step))]
+    im_sales = [n_per_time_step[x]["imitators"] - n_per_time_step[x - 1]["imitators"] if x > 0
+                else n_per_time_step[x]["imitators"] for x in range(len(n_per_time_step))]
+    return in_sales, im_sales
+
+
+def _split_community_to_innovators_and_imitators(graph, no_of_innovators, rng=None):
     '''
     function that sets attributes for all nodes regarding whether they are imitators or innovators
     :param graph: graph class
     :type graph: graph
     :param no_of_innovators: number of innovators
     :type no_of_innovators: int
+    :param rng: random generator or seed
+    :type rng: numpy Generator, int or None
     :return: networkx graph instance
     '''
     no_of_nodes = len(list(graph.nodes(data=True)))
-    innovators = sample(range(1, no_of_nodes+1), k=no_of_innovators)
+    innovators = set(np.random.default_rng(rng).choice(np.arange(1, no_of_nodes + 1), size=no_of_innovators,
+                                                       replace=False).tolist())
     for i in range(1, no_of_nodes + 1):
         if i in innovators:
             graph.nodes[i - 1]["type"] = 1
@@ -162,6 +193,22 @@ def _get_sales_in_groups(graph):
     return sales
 
 
+def _stack_sales(samples):
+    """
+    Stacks new sales of innovators and imitators from many simulations, padding shorter ones with zeros.
+    :param samples: list of pairs of lists of new sales per time step
+    :type samples: list
+    :return: array of shape (number of simulations, 2, number of time steps)
+    :rtype: numpy array
+    """
+    length = max(len(in_sales) for in_sales, _ in samples)
+    stacked = np.zeros([len(samples), 2, length])
+    for n, (in_sales, im_sales) in enumerate(samples):
+        stacked[n, 0, :len(in_sales)] = in_sales
+        stacked[n, 1, :len(im_sales)] = im_sales
+    return stacked
+
+
 def _column_wise_avg(rows):
     columns = zip_longest(*rows, fillvalue=0)
     return [sum(col) / len(rows) for col in columns]
@@ -0,0 +1,129 @@
+from collections import namedtuple
+from contextlib import nullcontext
+from multiprocessing import Pool
+import os
+import numpy as np
+
+SweepResult = namedtuple('SweepResult', ['params', 'samples', 'mean', 'var', 'error'])
+
+
+def run_sweep(func, params, repetitions=1, processes=1, chunksize=None, seed=None, reduce=True):
+    """
+    Runs func(param, rng) repetitions times for every parameter, optionally on a pool of processes.
+    Every run gets its own random generator spawned from one seed sequence, so results are reproducible
+    for a given seed and do not depend on how runs are distributed between processes.
+    :param func: function of parameter and numpy Generator; it has to be picklable (module level) when processes != 1
+    :type func: callable
+    :param params: parameter values
+    :type params: list
+    :param repetitions: number of runs per parameter
+    :type repetitions: int
+    :param processes: number of processes, 1 runs everything in the current process, None uses all cores
+    :type processes: int or None
+    :param chunksize: number of runs sent to a process at once, by default about 4 chunks per process
+    :type chunksize: int or None
+    :param seed: seed of the root seed sequence
+    :type seed: int or None
+    :param reduce: if True mean, variance and standard error of the mean over repetitions are calculated
+    (samples need the same shape)
+    :type reduce: bool
+    :return: parameters, list of samples per parameter, lists of means, variances and standard errors
+    per parameter (None if not reduced, standard errors are None for one repetition)
+    :rtype: SweepResult
+    """
+    params = list(params)
+    seeds = np.random.SeedSequence(seed).spawn(len(params) * repetitions)
+    tasks = [(func, param, seeds[n * repetitions + k]) for n, param in enumerate(params) for k in range(repetitions)]
+    with _get_pool(processes) as pool:
+        results = _map(tasks, pool, processes or os.cpu_count(), chunksize)
+    samples = [results[n * repetitions:(n + 1) * repetitions] for n in range(len(params))]
+    if not reduce:
+        return SweepResult(params, samples, None, None, None)
+    mean, var, error = zip(*[_get_moments(np.asarray(sample)) for sample in samples])
+    return SweepResult(params, samples, list(mean), list(var), list(error))
+
+
+def run_sequential(func, params, tol, batch=10, budget=1000, processes=1, chunksize=None, seed=None,
+                   stack=np.asarray):
+    """
+    Runs func(param, rng) in batches of repetitions, separately for every parameter, until the standard error
+    of the mean is below tol (for array results the largest one over elements) or budget samples were collected.
+    Every parameter gets its own seed sequence, so results do not depend on the number of processes either.
+    :param func: function of parameter and numpy Generator, see run_sweep
+    :type func: callable
+    :param params: parameter values
+    :type params: list
+    :param tol: target standard error of the mean
+    :type tol: float
+    :param batch: number of runs added in one round
+    :type batch: int
+    :param budget: maximum number of samples per parameter
+    :type budget: int
+    :param processes: number of processes, 1 runs everything in the current process, None uses all cores
+    :type processes: int or None
+    :param chunksize: number of runs sent to a process at once
+    :type chunksize: int or None
+    :param seed: seed of the root seed sequence
+    :type seed: int or None
+    :param stack: function making an array of samples along the first axis from the list of results,
+    e.g. np.concatenate when every run returns a vector of independent samples
+    :type stack: callable
+    :return: parameters, list of results per parameter, lists of means, variances and achieved standard errors
+    :rtype: SweepResult
+    """
+    params = list(params)
+    seeds = np.random.SeedSequence(seed).spawn(len(params))
+    samples = [[] for _ in params]
+    mean, var, error = [None] * len(params), [None] * len(params), [None] * len(params)
+    active = list(range(len(params)))
+    with _get_pool(processes) as pool:
+        while active:
+            tasks = [(func, params[n], s) for n in active for s in seeds[n].spawn(batch)]
+            results = _map(tasks, pool, processes or os.cpu_count(), chunksize)
+            converged = []
+            for k, n in enumerate(active):
+                samples[n].extend(results[k * batch:(k + 1) * batch])
+                values = stack(samples[n])
+                mean[n], var[n], error[n] = _get_moments(values)
+                if error[n] is not None and np.max(error[n]) <= tol or len(values) >= budget:
+                    converged.append(n)
+            active = [n for n in active if n not in converged]
+    return SweepResult(params, samples, mean, var, error)
+
+
+def _get_pool(processes):
+    """
+    Gets pool of processes, or an empty context if everything runs in the current process.
+    """
+    return nullcontext() if processes == 1 else Pool(processes)
+
+
+def _map(tasks, pool, processes, chunksize=None):
+    """
+    Runs tasks in the current process if there is no pool, otherwise on the pool of the given number of processes.
+    """
+    if pool is None:
+        return [_run_task(task) for task in tasks]
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (4 * processes))
+    return pool.map(_run_task, tasks, chunksize=chunksize)
+
+
+def _get_moments(values):
+    """
+    Gets mean, variance and standard error of the mean (None for a single sample) along the first axis.
+    """
+    mean, var = np.mean(values, axis=0), np.var(values, axis=0)
+    error = np.sqrt(var / (len(values) - 1)) if len(values) > 1 else None
+    return mean, var, error
+
+
+def _run_task(task):
+    """
+    Runs one task with its own random generator.
+    :param task: function, parameter and seed sequence
+    :type task: tuple
+    :return: result of the function
+    """
+    func, param, seed = task
+    return func(param, np.random.default_rng(seed))
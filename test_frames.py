@@ -0,0 +1,126 @@
+import threading
+import time
+import numpy as np
+from PIL import Image
+from pytest import raises
+from frames import FrameSink, GifWriter, StackSink, MemmapSink, AsyncSink
+
+
+def test_gif_writer_saves_palette_frames(tmp_path):
+    path = str(tmp_path / 'frames.gif')
+    palette = [(0, 0, 0), (255, 0, 0), (0, 0, 255)]
+    states = [np.array([[0, 1], [2, 1]]), np.array([[2, 2], [0, 0]])]
+    with GifWriter(path, palette, scale=3) as writer:
+        for state in states:
+            writer.append(state)
+
+    image = Image.open(path)
+    assert image.n_frames == 2
+    assert image.size == (6, 6)
+    for n, state in enumerate(states):
+        image.seek(n)
+        pixels = np.array(image.convert('RGB'))
+        expected = np.array(palette)[state].repeat(3, axis=0).repeat(3, axis=1)
+        np.testing.assert_array_equal(pixels, expected)
+
+
+def test_gif_writer_without_frames_writes_nothing(tmp_path):
+    path = tmp_path / 'empty.gif'
+    GifWriter(str(path), [(0, 0, 0)]).close()
+    assert not path.exists()
+
+
+def _frames(n=5, shape=(3, 4)):
+    return [np.full(shape, k % 4) + np.eye(*shape, dtype=int) for k in range(n)]
+
+
+def test_stack_sink_npz_and_npy(tmp_path):
+    for name in ['frames.npz', 'frames.npy']:
+        path = str(tmp_path / name)
+        with StackSink(path) as sink:
+            for frame in _frames():
+                sink.append(frame)
+        loaded = np.load(path)
+        frames = loaded['frames'] if name.endswith('.npz') else loaded
+        np.testing.assert_array_equal(frames, np.stack(_frames()))
+
+
+def test_memmap_sink_can_be_loaded_lazily(tmp_path):
+    path = str(tmp_path / 'frames.npy')
+    with MemmapSink(path) as sink:
+        for frame in _frames(n=300, shape=(20, 7)):
+            sink.append(frame)
+    frames = np.load(path, mmap_mode='r')
+    assert frames.shape == (300, 20, 7) and frames.dtype == np.uint8
+    np.testing.assert_array_equal(frames, np.stack(_frames(n=300, shape=(20, 7))))
+
+
+def test_memmap_sink_rejects_different_shapes(tmp_path):
+    sink = MemmapSink(str(tmp_path / 'frames.npy'))
+    sink.append(np.zeros([2, 2]))
+    with raises(ValueError):
+        sink.append(np.zeros([3, 2]))
+    sink.close()
+
+
+class _SlowSink(FrameSink):
+    def __init__(self):
+        self.frames, self.closed = [], False
+
+    def append(self, frame):
+        time.sleep(0.001)
+        self.frames.append(frame)
+
+    def close(self):
+        self.closed = True
+
+
+def test_async_sink_passes_copies_in_order():
+    inner = _SlowSink()
+    frame = np.zeros([4, 4], dtype=np.uint8)
+    with AsyncSink(inner, maxsize=2) as sink:
+        for k in range(20):
+            frame[...] = k
+            sink.append(frame)
+        sink.flush()
+        assert len(inner.frames) == 20
+    assert inner.closed
+    assert [int(f[0, 0]) for f in inner.frames] == list(range(20))
+    stats = sink.stats()
+    assert stats['frames'] == 20 and stats['render_time'] > 0
+
+
+def test_async_sink_closes_sink_on_worker():
+    class _SlowClosingSink(_SlowSink):
+        def close(self):
+            time.sleep(0.05)
+            self.closed = threading.current_thread()
+
+    inner = _SlowClosingSink()
+    sink = AsyncSink(inner)
+    sink.append(np.zeros([2, 2]))
+    sink.close()
+    assert inner.closed is sink._worker
+    assert sink.stats()['render_time'] >= 0.05
+
+
+def test_async_sink_reraises_worker_errors():
+    sink = AsyncSink(FrameSink())
+    sink.append(np.zeros([2, 2]))
+    with raises(NotImplementedError):
+        sink.flush()
+    sink.close()
+
+
+def test_gif_writer_streams_frames_with_scale_for_board_size(tmp_path):
+    path = tmp_path / 'large.gif'
+    writer = GifWriter(str(path), [(0, 0, 0), (255, 255, 255)], duration=200)
+    writer.append(np.eye(200, dtype=int))
+    size = writer._file.tell()
+    writer.append(np.eye(200, dtype=int)[::-1])
+    assert writer._file.tell() > size > 0
+    writer.close()
+
+    image = Image.open(str(path))
+    assert image.n_frames == 2 and image.size == (400, 400)
+    assert image.info['duration'] == 200 and image.info['loop'] == 0
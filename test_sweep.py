@@ -0,0 +1,62 @@
+import numpy as np
+from pytest import approx
+from sweep import run_sweep, run_sequential
+
+
+def _draw(param, rng):
+    return param + rng.random()
+
+
+def _draw_many(param, rng):
+    return rng.random(3)
+
+
+def _ragged(param, rng):
+    return list(range(int(rng.integers(1, 5))))
+
+
+def test_run_sweep_reduces_per_param():
+    result = run_sweep(_draw, [0, 10], repetitions=50, seed=1)
+    assert result.params == [0, 10]
+    assert [len(samples) for samples in result.samples] == [50, 50]
+    assert result.mean[0] == approx(np.mean(result.samples[0]))
+    assert 10 < result.mean[1] < 11
+    assert result.var[1] == approx(np.var(result.samples[1]))
+
+
+def test_run_sweep_does_not_depend_on_processes():
+    serial = run_sweep(_draw_many, [0, 1, 2], repetitions=4, seed=7)
+    parallel = run_sweep(_draw_many, [0, 1, 2], repetitions=4, seed=7, processes=2, chunksize=3)
+    np.testing.assert_array_equal(serial.samples, parallel.samples)
+    flat = np.concatenate(serial.samples)
+    assert len(np.unique(flat[:, 0])) == 12
+
+
+def test_run_sweep_without_reduce_keeps_ragged_samples():
+    result = run_sweep(_ragged, [None], repetitions=5, seed=3, reduce=False)
+    assert result.mean is None and result.var is None
+    assert len(result.samples[0]) == 5
+
+
+def _coin(param, rng):
+    return rng.random() < param
+
+
+def _coins(param, rng):
+    return rng.random(25) < param
+
+
+def test_run_sequential_stops_at_tolerance_or_budget():
+    result = run_sequential(_coin, [0.0, 0.5], tol=0.05, batch=10, budget=1000, seed=2)
+    assert len(result.samples[0]) == 10 and result.error[0] == 0
+    assert result.error[1] <= 0.05 and len(result.samples[1]) % 10 == 0
+    assert len(result.samples[1]) == len(run_sequential(_coin, [0.0, 0.5], 0.05, seed=2, processes=2).samples[1])
+    limited = run_sequential(_coin, [0.5], tol=0.001, batch=10, budget=30, seed=2)
+    assert len(limited.samples[0]) == 30 and limited.error[0] > 0.001
+
+
+def test_run_sequential_stacks_vector_results():
+    result = run_sequential(_coins, [0.5], tol=0.03, batch=1, seed=4, stack=np.concatenate)
+    n_samples = 25 * len(result.samples[0])
+    assert result.error[0] == approx(np.sqrt(result.var[0] / (n_samples - 1)))
+    assert result.error[0] <= 0.03